@@ -1,11 +1,12 @@
 import streamlit as st
 import pandas as pd
 import logging
-from src.tmdb_utils import fetch_poster
-from src.recommender import recommend, movies
+from src.tmdb_utils import fetch_many
+from src.recommender import recommend, recommend_filtered, recommend_for_user, movies, catalog, search_index
+from src.dashboard import load_watchlist_page, load_ratings_page
 from src.Database.database import init_database, get_db_session
 from src.Database.user_manager import UserManager
-from src.Database.models import WatchlistItem, Rating, User, Feedback
+from src.Database.models import User, Feedback
 from src.admin.admin_pages import admin_dashboard_page
 
 # Setting up logging
@@ -22,6 +23,8 @@ st.set_page_config(
 # Initializing UserManager
 user_manager = UserManager()
 
+SEARCH_PAGE_SIZE = 20
+
 def login_page():
     st.markdown('<h1 class="main-header">🎬 Movie Recommender - Login</h1>', unsafe_allow_html=True)
     tab1, tab2 = st.tabs(["Login", "Register"])
@@ -71,10 +74,42 @@ def login_page():
                 else:
                     st.error("Please fill in all required fields and accept terms")
 
+def _recommendation_filters():
+    """Sidebar filters for 'Get Recommendations'; returns recommend_filtered keyword arguments, or None if all are off."""
+    with st.sidebar.expander("Filters"):
+        hide_seen = st.checkbox("Hide movies I've rated or watchlisted", value=True, key='filter_hide_seen')
+        genres = st.multiselect("Only genres", catalog.genres, key='filter_genres')
+        known_years = None if catalog.years is None else catalog.years[catalog.years > 0]
+        year_range = None
+        if known_years is not None and len(known_years):
+            first, last = int(known_years.min()), int(known_years.max())
+            if first < last:
+                year_range = st.slider("Release year", first, last, (first, last), key='filter_years')
+    filters = {}
+    if hide_seen:
+        filters['user_id'] = st.session_state.user_id
+    if genres:
+        filters['genres'] = genres
+    if year_range is not None and year_range != (first, last):
+        filters['min_year'], filters['max_year'] = year_range
+    return filters or None
+
 def recommender_page():
     st.title('🎬 Movie Recommender System')
     if 'selected_movie' not in st.session_state:
         st.session_state.selected_movie = None
+    try:
+        for_you = recommend_for_user(st.session_state.user_id)
+    except Exception as e:
+        logger.error(f"Error building personalized recommendations: {e}")
+        for_you = []
+    if for_you:
+        st.header("🎯 Recommended For You")
+        cols = st.columns(5)
+        for i, movie in enumerate(for_you):
+            with cols[i % 5]:
+                st.image(movie['poster'], use_container_width=True)
+                st.caption(movie['title'])
     st.sidebar.header("Explore & Discover")
     all_genres = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Drama', 'Fantasy', 'Horror', 'ScienceFiction', 'Thriller']
     display_genres = ["-"] + [g.replace('ScienceFiction', 'Science Fiction') for g in all_genres]
@@ -82,47 +117,46 @@ def recommender_page():
     if selected_display_genre != "-":
         selected_genre = selected_display_genre.replace('Science Fiction', 'ScienceFiction')
         st.header(f"Top Movies in {selected_display_genre}")
-        genre_movies = movies[movies['genres'].apply(lambda x: selected_genre in x)].head(10)
-        if not genre_movies.empty:
+        genre_rows = catalog.top_in_genres([selected_genre], limit=10)
+        if len(genre_rows):
+            metadata_by_id = fetch_many(catalog.movie_ids[genre_rows])
             cols = st.columns(5)
-            for i, (idx, row) in enumerate(genre_movies.iterrows()):
+            for i, row in enumerate(genre_rows):
                 with cols[i % 5]:
-                    movie_id = row['movie_id']
-                    poster_url = fetch_poster(movie_id)
+                    poster_url = metadata_by_id[catalog.movie_id(row)]['poster']
                     st.image(poster_url, use_container_width=True)
-                    st.caption(row['title'])
+                    st.caption(catalog.title(row))
         else:
             st.write("No movies found for this genre in the current dataset.")
     st.sidebar.markdown("---")
     st.sidebar.header("Get Recommendations")
     movie_list = movies['title'].values
     selected_title = st.sidebar.selectbox("Type or select a movie", options=movie_list, key='movie_selector')
+    filters = _recommendation_filters()
     if st.sidebar.button('Get Recommendations'):
         st.session_state.selected_movie = selected_title
     if st.session_state.selected_movie:
         st.header(f"Recommendations for: *{st.session_state.selected_movie}*")
-        recommended_movies = recommend(st.session_state.selected_movie)
+        if filters:
+            recommended_movies = recommend_filtered(st.session_state.selected_movie, **filters)
+        else:
+            recommended_movies = recommend(st.session_state.selected_movie)
         if recommended_movies:
             cols = st.columns(5)
             for i, movie in enumerate(recommended_movies):
-                movie_id = movies[movies['title'] == movie['title']].iloc[0]['movie_id']
+                movie_id = movie['movie_id']
                 with cols[i % 5]:
                     st.image(movie['poster'], use_container_width=True)
                     b_col1, b_col2 = st.columns(2)
                     with b_col1:
                         if st.button("➕", key=f"watch_{movie_id}", help="Add to Watchlist"):
-                            try:
-                                with get_db_session() as session:
-                                    exists = session.query(WatchlistItem).filter_by(user_id=st.session_state.user_id, movie_id=movie_id).first()
-                                    if not exists:
-                                        new_item = WatchlistItem(user_id=st.session_state.user_id, movie_id=movie_id, movie_title=movie['title'])
-                                        session.add(new_item)
-                                        st.toast(f"Added '{movie['title']}' to your watchlist!")
-                                    else:
-                                        st.toast(f"'{movie['title']}' is already in your watchlist.")
-                            except Exception as e:
-                                logger.error(f"Error adding to watchlist: {e}")
+                            added = user_manager.add_to_watchlist(st.session_state.user_id, movie_id, movie['title'])
+                            if added is None:
                                 st.error("Could not add to watchlist.")
+                            elif added:
+                                st.toast(f"Added '{movie['title']}' to your watchlist!")
+                            else:
+                                st.toast(f"'{movie['title']}' is already in your watchlist.")
                     if st.button(movie['title'], key=f"title_{movie_id}"):
                         st.session_state.selected_movie = movie['title']
                         st.rerun()
@@ -135,71 +169,87 @@ def recommender_page():
                         else:
                             st.text("No trailer available.")
         else:
-            st.error("Could not find recommendations for this movie.")
+            st.error("No movies match these filters." if filters and catalog.row_for_title(st.session_state.selected_movie) is not None
+                     else "Could not find recommendations for this movie.")
     else:
         st.info("Select a movie from the sidebar and click 'Get Recommendations' to start.")
 
+def _page_cursor(name):
+    """Keyset cursor of the dashboard page being shown; the stack holds one cursor per page visited."""
+    cursors = st.session_state.setdefault(f"{name}_cursors", [None])
+    return cursors[-1]
+
+def _page_controls(name, next_cursor):
+    cursors = st.session_state[f"{name}_cursors"]
+    prev_col, _, next_col = st.columns([1, 4, 1])
+    with prev_col:
+        if len(cursors) > 1 and st.button("⬅️ Previous", key=f"{name}_prev"):
+            cursors.pop()
+            st.rerun()
+    with next_col:
+        if next_cursor is not None and st.button("Next ➡️", key=f"{name}_next"):
+            cursors.append(next_cursor)
+            st.rerun()
+
 def user_dashboard():
     st.title(f"Dashboard for {st.session_state.username}")
     tab1, tab2, tab3 = st.tabs(["My Watchlist", "My Ratings", "👤 Profile & Settings"])
     with tab1:
         st.header("🎬 Movies to Watch")
         try:
-            with get_db_session() as session:
-                watchlist_items = session.query(WatchlistItem).filter_by(user_id=st.session_state.user_id).order_by(WatchlistItem.added_at.desc()).all()
-                if not watchlist_items:
-                    st.info("Your watchlist is empty.")
-                else:
-                    cols = st.columns(4)
-                    for i, item in enumerate(watchlist_items):
-                        with cols[i % 4]:
-                            st.image(fetch_poster(item.movie_id), use_container_width=True)
-                            st.caption(item.movie_title)
-                            if st.button("🗑️ Remove", key=f"remove_watchlist_{item.id}", help="Remove from watchlist"):
-                                item_to_delete = session.query(WatchlistItem).get(item.id)
-                                if item_to_delete:
-                                    session.delete(item_to_delete)
-                                    session.commit()
-                                    st.toast(f"Removed '{item.movie_title}' from watchlist!")
-                                    st.rerun()
+            watchlist_items, next_cursor = load_watchlist_page(st.session_state.user_id, catalog, _page_cursor('watchlist'))
+            if not watchlist_items:
+                st.info("Your watchlist is empty.")
+            else:
+                cols = st.columns(4)
+                for i, item in enumerate(watchlist_items):
+                    with cols[i % 4]:
+                        st.image(item['poster'], use_container_width=True)
+                        st.caption(item['title'])
+                        if st.button("🗑️ Remove", key=f"remove_watchlist_{item['id']}", help="Remove from watchlist"):
+                            if user_manager.remove_from_watchlist(st.session_state.user_id, item['movie_id']):
+                                st.toast(f"Removed '{item['title']}' from watchlist!")
+                                st.rerun()
+                            else:
+                                st.error("Could not remove the movie.")
+                _page_controls('watchlist', next_cursor)
         except Exception as e:
             logger.error(f"Error loading watchlist: {e}")
             st.error("Could not load your watchlist.")
     with tab2:
         st.header("⭐ My Movie Ratings")
         try:
-            with get_db_session() as session:
-                user_ratings = session.query(Rating).filter_by(user_id=st.session_state.user_id).order_by(Rating.created_at.desc()).all()
-                if not user_ratings:
-                    st.info("You haven't rated any movies yet.")
-                else:
-                    for rating in user_ratings:
-                        movie_info = movies.loc[movies['movie_id'] == rating.movie_id]
-                        if not movie_info.empty:
-                            movie_title = movie_info['title'].iloc[0]
-                            with st.container():
-                                col1, col2 = st.columns([1, 3])
-                                with col1:
-                                    st.image(fetch_poster(rating.movie_id))
-                                with col2:
-                                    st.subheader(movie_title)
-                                    new_rating_val = st.slider("Update your rating", 1, 10, int(rating.rating), key=f"dash_slider_{rating.id}")
-                                    btn_col1, btn_col2, _ = st.columns([1, 1, 2])
-                                    with btn_col1:
-                                        if st.button("Update", key=f"update_rating_{rating.id}"):
-                                            rating_to_update = session.query(Rating).get(rating.id)
-                                            rating_to_update.rating = float(new_rating_val)
-                                            session.commit()
+            user_ratings, next_cursor = load_ratings_page(st.session_state.user_id, catalog, _page_cursor('ratings'))
+            if not user_ratings:
+                st.info("You haven't rated any movies yet.")
+            else:
+                for rating in user_ratings:
+                    movie_title = rating['title']
+                    if movie_title is not None:
+                        with st.container():
+                            col1, col2 = st.columns([1, 3])
+                            with col1:
+                                st.image(rating['poster'])
+                            with col2:
+                                st.subheader(movie_title)
+                                new_rating_val = st.slider("Update your rating", 1, 10, int(rating['rating']), key=f"dash_slider_{rating['id']}")
+                                btn_col1, btn_col2, _ = st.columns([1, 1, 2])
+                                with btn_col1:
+                                    if st.button("Update", key=f"update_rating_{rating['id']}"):
+                                        if user_manager.rate_movie(st.session_state.user_id, rating['movie_id'], new_rating_val):
                                             st.toast(f"Updated rating for '{movie_title}'!")
                                             st.rerun()
-                                    with btn_col2:
-                                        if st.button("Delete", key=f"delete_rating_{rating.id}"):
-                                            rating_to_delete = session.query(Rating).get(rating.id)
-                                            session.delete(rating_to_delete)
-                                            session.commit()
+                                        else:
+                                            st.error("Could not update the rating.")
+                                with btn_col2:
+                                    if st.button("Delete", key=f"delete_rating_{rating['id']}"):
+                                        if user_manager.delete_rating(st.session_state.user_id, rating['movie_id']):
                                             st.toast(f"Deleted your rating for '{movie_title}'!")
                                             st.rerun()
-                                st.markdown("---")
+                                        else:
+                                            st.error("Could not delete the rating.")
+                            st.markdown("---")
+                _page_controls('ratings', next_cursor)
         except Exception as e:
             logger.error(f"Error loading ratings: {e}")
             st.error("Could not load your ratings.")
@@ -253,45 +303,62 @@ def feedback_page():
 def search_and_rate_page():
     st.title("🔎 Search and Rate Movies")
     search_query = st.text_input("Enter a movie title to search", "")
+    if st.session_state.get('search_query') != search_query:
+        st.session_state.search_query = search_query
+        st.session_state.search_page = 0
     if search_query:
-        results = movies[movies['title'].str.contains(search_query, case=False, na=False)]
-        if not results.empty:
-            st.subheader(f"Found {len(results)} results for '{search_query}'")
-            for index, row in results.iterrows():
-                movie_id = row['movie_id']
-                movie_title = row['title']
+        page = st.session_state.search_page
+        rows, total = search_index.search(search_query, limit=SEARCH_PAGE_SIZE, offset=page * SEARCH_PAGE_SIZE)
+        if total:
+            first = page * SEARCH_PAGE_SIZE
+            st.subheader(f"Found {total} results for '{search_query}' (showing {first + 1}-{first + len(rows)})")
+            metadata_by_id = fetch_many(catalog.movie_ids[rows])
+            for row in rows:
+                movie_id = catalog.movie_id(row)
+                movie_title = catalog.title(row)
                 col1, col2 = st.columns([1, 4])
                 with col1:
-                    st.image(fetch_poster(movie_id), use_container_width=True)
+                    st.image(metadata_by_id[movie_id]['poster'], use_container_width=True)
                 with col2:
                     st.subheader(movie_title)
                     rating_val = st.slider("Your Rating (1-10)", 1, 10, 5, key=f"search_rate_slider_{movie_id}")
                     if st.button("⭐ Rate", key=f"search_rate_btn_{movie_id}"):
-                        try:
-                            with get_db_session() as session:
-                                existing_rating = session.query(Rating).filter_by(user_id=st.session_state.user_id, movie_id=movie_id).first()
-                                if existing_rating:
-                                    existing_rating.rating = float(rating_val)
-                                    st.toast(f"Updated your rating for '{movie_title}' to {rating_val}!")
-                                else:
-                                    new_rating = Rating(user_id=st.session_state.user_id, movie_id=movie_id, rating=float(rating_val))
-                                    session.add(new_rating)
-                                    st.toast(f"You rated '{movie_title}' {rating_val}/10!")
-                        except Exception as e:
-                            logger.error(f"Error submitting rating from search: {e}")
+                        if user_manager.rate_movie(st.session_state.user_id, movie_id, rating_val):
+                            st.toast(f"You rated '{movie_title}' {rating_val}/10!")
+                        else:
                             st.error("Could not submit rating.")
                 st.markdown("---")
+            prev_col, _, next_col = st.columns([1, 4, 1])
+            with prev_col:
+                if page > 0 and st.button("⬅️ Previous", key="search_prev"):
+                    st.session_state.search_page -= 1
+                    st.rerun()
+            with next_col:
+                if first + len(rows) < total and st.button("Next ➡️", key="search_next"):
+                    st.session_state.search_page += 1
+                    st.rerun()
         else:
             st.warning(f"No movies found matching '{search_query}'. Please try another title.")
     else:
         st.info("Type a movie title above to begin your search.")
 
-def main():
+@st.cache_resource
+def bootstrap():
+    """
+    Runs once per process instead of on every rerun: schema migrations and the default admin.
+    A failure raises, and st.cache_resource does not cache exceptions, so the next rerun retries.
+    """
     if not init_database():
+        raise RuntimeError("Database initialization failed")
+    user_manager.ensure_admin_exists()
+    return True
+
+def main():
+    try:
+        bootstrap()
+    except RuntimeError:
         st.error("Failed to initialize database. Please check your configuration.")
         return
-        
-    user_manager.ensure_admin_exists()
 
     if 'logged_in' not in st.session_state or not st.session_state.get('logged_in', False):
         login_page()
@@ -308,7 +375,7 @@ def main():
     page = st.sidebar.radio("Navigation", nav_options)
     
     if st.sidebar.button("Logout"):
-        for key in ['logged_in', 'user_id', 'username', 'is_admin']:
+        for key in ['logged_in', 'user_id', 'username', 'is_admin', 'watchlist_cursors', 'ratings_cursors', 'feedback_cursors']:
             if key in st.session_state:
                 del st.session_state[key]
         st.rerun()
@@ -0,0 +1 @@
+"""Latency and throughput benchmarks on synthetic data (see benchmarks/run.py)"""
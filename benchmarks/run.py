@@ -0,0 +1,217 @@
+"""
+Benchmarks recommend, search, genre browse, the dashboard, rating writes and admin queries
+on a synthetic catalog and ratings table, against a local TMDB stub, and writes JSON results.
+
+Usage:
+    python -m benchmarks.run --movies 5000 --users 2000 --ratings 200000 --output results.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCENARIOS = ['recommend', 'recommend_filtered', 'recommend_for_user', 'search', 'genre', 'dashboard', 'rate', 'admin']
+# Calls per scenario that only warm up (caches, connections) before the measured ones
+WARMUP_CALLS = 10
+
+
+def summarize(latencies, wall_seconds):
+    latencies = np.asarray(latencies) * 1000.0
+    return {
+        'count': int(len(latencies)),
+        'mean_ms': round(float(latencies.mean()), 3),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'max_ms': round(float(latencies.max()), 3),
+        'throughput_per_s': round(len(latencies) / wall_seconds, 1),
+    }
+
+
+def measure(fn, calls, concurrency=1, warmup=WARMUP_CALLS):
+    """
+    Calls fn(*args) for every args tuple in calls, on `concurrency` threads, and summarizes the latencies.
+    The first `warmup` calls only warm up and are not measured, so measured calls never reuse their arguments.
+    """
+    warmup_calls, calls = calls[:warmup], calls[warmup:]
+    for args in warmup_calls:
+        fn(*args)
+
+    def timed(args):
+        start = time.perf_counter()
+        fn(*args)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        latencies = [timed(args) for args in calls]
+    else:
+        with ThreadPoolExecutor(concurrency) as executor:
+            latencies = list(executor.map(timed, calls))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def prepare(args):
+    """Starts the TMDB stub, points the app's settings at the work directory and builds the artifacts there."""
+    from benchmarks.tmdb_stub import start_stub
+
+    artifact_dir = os.path.join(args.workdir, 'artifacts')
+    database_path = os.path.join(args.workdir, 'benchmark.db')
+    _, base_url = start_stub(latency_ms=args.tmdb_latency_ms)
+    # The app modules read these when they are imported, so set them before importing any
+    os.environ['ARTIFACT_DIR'] = artifact_dir
+    os.environ['TMDB_BASE_URL'] = base_url
+    os.environ['TMDB_CACHE_PATH'] = os.path.join(args.workdir, 'tmdb_cache.db')
+    # Never the DATABASE_URL of the environment: the run writes thousands of synthetic users and ratings
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{database_path}"
+
+    from benchmarks.synthetic import write_catalog
+    from src.build_index import build
+    from src.artifacts import MANIFEST_FILE, current_directory
+
+    fresh = not (args.reuse and os.path.exists(os.path.join(current_directory(artifact_dir), MANIFEST_FILE)))
+    if fresh:
+        movies_csv, credits_csv = write_catalog(os.path.join(args.workdir, 'csv'), args.movies, seed=args.seed)
+        build(movies_csv, credits_csv, artifact_dir, workers=args.workers, embedding_dim=0)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(database_path + suffix):
+                os.remove(database_path + suffix)
+        cache_path = os.environ['TMDB_CACHE_PATH']
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+    return fresh
+
+
+def populate(args):
+    from benchmarks.synthetic import populate_database
+    from src.Database.database import get_db_session
+    from src.Database.aggregates import rebuild_aggregates
+    from src.recommender import catalog
+
+    with get_db_session() as session:
+        user_ids = populate_database(session, catalog.movie_ids, args.users, args.ratings, seed=args.seed)
+    rebuild_aggregates()
+    return user_ids
+
+
+def run_scenarios(args, user_ids):
+    from src.recommender import recommend, recommend_filtered, recommend_for_user, catalog, search_index
+    from src.tmdb_utils import fetch_many
+    from src.dashboard import load_ratings_page
+    from src.Database.user_manager import UserManager
+    from src.admin.admin_manager import AdminManager
+
+    rng = random.Random(args.seed)
+    # Every scenario gets WARMUP_CALLS extra calls with their own arguments (see measure)
+    n = args.iterations + WARMUP_CALLS
+    titles = [catalog.title(rng.randrange(len(catalog))) for _ in range(n)]
+    users = [rng.choice(user_ids) for _ in range(n)]
+    user_manager = UserManager()
+    admin_manager = AdminManager()
+
+    def genre_page(genre):
+        fetch_many(catalog.movie_ids[catalog.top_in_genres([genre], limit=10)])
+
+    def filtered_recommend(title, user, genre):
+        # The user's seen movies left out, plus a genre and a year bound
+        recommend_filtered(title, user_id=user, genres=[genre], min_year=2000)
+
+    def admin_page():
+        admin_manager.get_key_metrics()
+        admin_manager.get_most_rated_movies(catalog.movies, limit=10)
+        admin_manager.get_user_activity(limit=10)
+        admin_manager.get_feedback_page()
+
+    calls = {
+        'recommend': (recommend, [(title,) for title in titles], 1),
+        'recommend_filtered': (filtered_recommend,
+                               [(title, user, rng.choice(catalog.genres)) for title, user in zip(titles, users)], 1),
+        'recommend_for_user': (recommend_for_user, [(user,) for user in users], 1),
+        # Partial titles, as typed into the search box
+        'search': (search_index.search, [(title[:rng.randint(3, len(title))],) for title in titles], 1),
+        'genre': (genre_page, [(rng.choice(catalog.genres),) for _ in range(n)], 1),
+        'dashboard': (load_ratings_page, [(user, catalog) for user in users], 1),
+        'rate': (user_manager.rate_movie,
+                 [(user, catalog.movie_id(rng.randrange(len(catalog))), rng.randint(1, 10)) for user in users],
+                 args.write_concurrency),
+        'admin': (admin_page, [() for _ in range(max(args.iterations // 10, 1) + WARMUP_CALLS)], 1),
+    }
+
+    results = {}
+    for name in args.scenarios:
+        fn, scenario_calls, concurrency = calls[name]
+        results[name] = measure(fn, scenario_calls, concurrency=concurrency)
+        logger.info(f"{name}: {results[name]}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the latency/throughput benchmarks on synthetic data")
+    parser.add_argument('--movies', type=int, default=5000, help="Catalog size (1k-100k)")
+    parser.add_argument('--users', type=int, default=2000, help="Synthetic users")
+    parser.add_argument('--ratings', type=int, default=200_000, help="Synthetic ratings (up to 10M)")
+    parser.add_argument('--iterations', type=int, default=500, help="Calls measured per scenario")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Comma-separated subset of " + ', '.join(SCENARIOS))
+    parser.add_argument('--write-concurrency', type=int, default=8, help="Threads issuing rating writes")
+    parser.add_argument('--tmdb-latency-ms', type=float, default=20.0, help="Simulated TMDB response time")
+    parser.add_argument('--workdir', default='benchmark_data', help="Where generated data is kept")
+    parser.add_argument('--reuse', action='store_true', help="Reuse the catalog and database in --workdir")
+    parser.add_argument('--database-url', default=None,
+                        help="Benchmark this database instead of a SQLite file in --workdir (it gets synthetic data)")
+    parser.add_argument('--workers', type=int, default=None, help="Index build worker processes")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="JSON file for the results (default: stdout)")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.INFO)
+    fresh = prepare(args)
+
+    from src.Database.database import init_database
+    if not init_database():
+        sys.exit("Database initialization failed")
+    if fresh:
+        user_ids = populate(args)
+    else:
+        from sqlalchemy import select
+        from src.Database.database import get_db_session
+        from src.Database.models import User
+        with get_db_session() as session:
+            user_ids = session.execute(select(User.id)).scalars().all()
+
+    report = {
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+        'config': {key: getattr(args, key) for key in
+                   ('movies', 'users', 'ratings', 'iterations', 'write_concurrency', 'tmdb_latency_ms', 'seed')},
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'database': os.environ['DATABASE_URL'].split('://')[0],
+        },
+        'results': run_scenarios(args, user_ids),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        logger.info(f"Results written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Synthetic TMDB-style catalogs and users/ratings for the benchmarks. The catalog CSVs have the
+columns src.build_index reads; users and ratings go straight into the src/Database/models.py tables.
+"""
+
+import os
+import json
+import uuid
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+from src.Database.models import User, Rating
+
+logger = logging.getLogger(__name__)
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family',
+          'Fantasy', 'History', 'Horror', 'Music', 'Mystery', 'Romance', 'Science Fiction', 'Thriller',
+          'War', 'Western']
+VOCABULARY_SIZE = 5000
+INSERT_CHUNK_SIZE = 50_000
+
+
+def _documents(names):
+    return json.dumps([{'id': i, 'name': name} for i, name in enumerate(names)])
+
+
+def generate_catalog(n_movies, seed=0):
+    """
+    Returns (movies, credits) DataFrames shaped like tmdb_5000_movies.csv / tmdb_5000_credits.csv.
+    Overview words and keywords follow a Zipf law, so tag vectors are sparse and skewed like real text.
+    """
+    rng = np.random.default_rng(seed)
+    words = np.array([f"word{i}" for i in range(VOCABULARY_SIZE)])
+    # Each genre draws from its own slice of the vocabulary, giving movies real neighbors
+    genre_ids = np.stack([rng.choice(len(GENRES), size=2, replace=False) for _ in range(n_movies)])
+    word_ranks = np.minimum(rng.zipf(1.3, size=(n_movies, 25)), VOCABULARY_SIZE // 2) - 1
+    word_ids = (word_ranks + genre_ids[:, :1] * 97) % VOCABULARY_SIZE
+
+    movie_ids = np.arange(n_movies) * 3 + 11
+    titles = [f"Movie {i}" if i % 4 else f"The Film {i}" for i in range(n_movies)]
+    years = rng.integers(1950, 2025, size=n_movies)
+    movies = pd.DataFrame({
+        'id': movie_ids,
+        'title': titles,
+        'overview': [' '.join(words[row[:20]]) for row in word_ids],
+        'genres': [_documents(GENRES[g] for g in row) for row in genre_ids],
+        'keywords': [_documents(words[row[20:]]) for row in word_ids],
+        'popularity': rng.gamma(2.0, 10.0, size=n_movies).round(3),
+        'vote_average': rng.normal(6.2, 1.1, size=n_movies).clip(0, 10).round(1),
+        'vote_count': rng.zipf(1.6, size=n_movies).clip(0, 20000),
+        'release_date': [f"{year}-{rng.integers(1, 13):02d}-01" for year in years],
+    })
+    credits = pd.DataFrame({
+        'movie_id': movie_ids,
+        'title': titles,
+        'cast': [_documents(f"Actor {a}" for a in rng.integers(0, n_movies // 2 + 10, size=5)) for _ in range(n_movies)],
+        'crew': [json.dumps([{'name': f"Director {rng.integers(0, n_movies // 5 + 10)}", 'job': 'Director'}])
+                 for _ in range(n_movies)],
+    })
+    return movies, credits
+
+
+def write_catalog(directory, n_movies, seed=0):
+    """Writes movies.csv and credits.csv into directory and returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    movies, credits = generate_catalog(n_movies, seed)
+    movies_csv, credits_csv = os.path.join(directory, 'movies.csv'), os.path.join(directory, 'credits.csv')
+    movies.to_csv(movies_csv, index=False)
+    credits.to_csv(credits_csv, index=False)
+    return movies_csv, credits_csv
+
+
+def generate_ratings(movie_ids, n_users, n_ratings, seed=0):
+    """
+    Returns (user_rows, movie_ids, ratings) arrays of distinct (user, movie) pairs. Activity is
+    lognormal across users and popularity follows a power law across movies, so a few users rate
+    a lot and a few movies are rated by many.
+    """
+    rng = np.random.default_rng(seed)
+    movie_ids = np.asarray(movie_ids, dtype=np.int64)
+    n_movies = len(movie_ids)
+    n_ratings = min(n_ratings, n_users * n_movies)
+
+    user_weights = rng.lognormal(0.0, 1.0, size=n_users)
+    user_weights /= user_weights.sum()
+    # Nobody is expected to rate more than a quarter of the catalog, so deduping converges quickly
+    user_weights = np.minimum(user_weights, max(n_movies / 4 / n_ratings, 1 / n_users))
+    user_weights /= user_weights.sum()
+    movie_weights = 1.0 / np.arange(1, n_movies + 1) ** 0.8
+    movie_weights = rng.permutation(movie_weights / movie_weights.sum())
+
+    keys = np.empty(0, dtype=np.int64)
+    # Draw extra pairs and dedupe until there are enough distinct ones
+    while len(keys) < n_ratings:
+        draw = int((n_ratings - len(keys)) * 1.2) + 1000
+        users = rng.choice(n_users, size=draw, p=user_weights)
+        movies = rng.choice(n_movies, size=draw, p=movie_weights)
+        keys = np.unique(np.concatenate([keys, users * n_movies + movies]))
+    keys = rng.permutation(keys)[:n_ratings]
+    ratings = rng.integers(1, 11, size=n_ratings).astype(np.float32)
+    return keys // n_movies, movie_ids[keys % n_movies], ratings
+
+
+def populate_database(session, movie_ids, n_users, n_ratings, seed=0, chunk_size=INSERT_CHUNK_SIZE):
+    """
+    Inserts n_users users and n_ratings ratings with Core executemany, committing every chunk,
+    and returns the user ids. Summary tables are not touched; rebuild them afterwards.
+    """
+    password_hash = "0" * 64
+    user_ids = [str(uuid.uuid4()) for _ in range(n_users)]
+    start = datetime(2020, 1, 1)
+    for offset in range(0, n_users, chunk_size):
+        session.execute(insert(User), [
+            {'id': user_id, 'username': f"user{offset + i}", 'email': f"user{offset + i}@example.com",
+             'password_hash': password_hash, 'created_at': start, 'updated_at': start,
+             'is_active': True, 'is_admin': False}
+            for i, user_id in enumerate(user_ids[offset:offset + chunk_size])
+        ])
+        session.commit()
+
+    users, movies, ratings = generate_ratings(movie_ids, n_users, n_ratings, seed)
+    seconds = np.random.default_rng(seed).integers(0, 3 * 365 * 86400, size=len(users))
+    for offset in range(0, len(users), chunk_size):
+        stop = offset + chunk_size
+        session.execute(insert(Rating), [
+            {'id': str(uuid.uuid4()), 'user_id': user_ids[user], 'movie_id': int(movie),
+             'rating': float(rating), 'created_at': start + timedelta(seconds=int(second))}
+            for user, movie, rating, second in zip(users[offset:stop].tolist(), movies[offset:stop].tolist(),
+                                                   ratings[offset:stop].tolist(), seconds[offset:stop].tolist())
+        ])
+        session.commit()
+        logger.info(f"Inserted {min(stop, len(users))}/{len(users)} ratings")
+    return user_ids
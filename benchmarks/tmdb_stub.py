@@ -0,0 +1,43 @@
+"""A local stand-in for the TMDB movie endpoint used by src/tmdb_utils.py"""
+
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class TMDBStubHandler(BaseHTTPRequestHandler):
+    """Answers GET /movie/<id> with a fixed-shape movie, after the server's simulated latency."""
+
+    def do_GET(self):
+        movie_id = self.path.split('?')[0].rstrip('/').split('/')[-1]
+        if not movie_id.isdigit():
+            self.send_error(404)
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = json.dumps({
+            'id': int(movie_id),
+            'poster_path': f"/{movie_id}.jpg",
+            'overview': f"Overview of movie {movie_id}.",
+            'vote_average': 6.5,
+            'release_date': '2000-01-01',
+            'videos': {'results': [{'type': 'Trailer', 'site': 'YouTube', 'key': f"trailer{movie_id}"}]},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(latency_ms=0.0, host='127.0.0.1', port=0):
+    """Serves the stub on a background thread; returns (server, base_url) with base_url in TMDB_BASE_URL form."""
+    server = ThreadingHTTPServer((host, port), TMDBStubHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000.0
+    threading.Thread(target=server.serve_forever, name="tmdb-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/movie/{{}}"
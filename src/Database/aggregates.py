@@ -0,0 +1,91 @@
+"""
+Summary tables for the admin dashboard: per-movie rating counts and sums, per-user
+activity and global counters. The record_* helpers run inside the session of the
+write they describe, so a summary row commits or rolls back with it.
+
+Usage (backfill from the base tables):
+    python -m src.Database.aggregates
+"""
+
+import logging
+from sqlalchemy import select, insert, delete, func
+from .models import User, Rating, Feedback, MovieRatingStats, UserActivity, Counter
+from .database import get_db_session, upsert_insert, init_database
+
+logger = logging.getLogger(__name__)
+
+
+def _increment(session, model, keys, **deltas):
+    """Adds deltas to columns of the summary row identified by keys, creating the row if needed."""
+    statement = upsert_insert(session, model)
+    if statement is None:
+        row = session.get(model, next(iter(keys.values())))
+        if row is None:
+            session.add(model(**keys, **deltas))
+        else:
+            for column, delta in deltas.items():
+                setattr(row, column, getattr(row, column) + delta)
+        return
+
+    statement = statement.values(**keys, **deltas)
+    session.execute(statement.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: getattr(model, column) + statement.excluded[column] for column in deltas}
+    ))
+
+
+def record_rating(session, user_id, movie_id, count_delta, sum_delta):
+    """count_delta is 1 for a new rating, -1 for a deleted one and 0 when a rating changes."""
+    _increment(session, MovieRatingStats, {'movie_id': movie_id}, rating_count=count_delta, rating_sum=sum_delta)
+    if count_delta:
+        _increment(session, UserActivity, {'user_id': user_id}, rating_count=count_delta)
+        _increment(session, Counter, {'name': 'ratings'}, value=count_delta)
+
+
+def record_feedback(session, user_id):
+    _increment(session, UserActivity, {'user_id': user_id}, feedback_count=1)
+    _increment(session, Counter, {'name': 'feedback'}, value=1)
+
+
+def record_user(session):
+    _increment(session, Counter, {'name': 'users'}, value=1)
+
+
+def _rebuild(connection):
+    for model in (MovieRatingStats, UserActivity, Counter):
+        connection.execute(delete(model))
+
+    connection.execute(insert(MovieRatingStats).from_select(
+        ['movie_id', 'rating_count', 'rating_sum'],
+        select(Rating.movie_id, func.count(Rating.id), func.sum(Rating.rating)).group_by(Rating.movie_id)
+    ))
+
+    ratings = select(func.count(Rating.id)).where(Rating.user_id == User.id).scalar_subquery()
+    feedback = select(func.count(Feedback.id)).where(Feedback.user_id == User.id).scalar_subquery()
+    connection.execute(insert(UserActivity).from_select(
+        ['user_id', 'rating_count', 'feedback_count'],
+        select(User.id, ratings, feedback)
+    ))
+    # Users with no activity do not need a row
+    connection.execute(delete(UserActivity).where(UserActivity.rating_count == 0, UserActivity.feedback_count == 0))
+
+    for name, model in (('users', User), ('ratings', Rating), ('feedback', Feedback)):
+        connection.execute(insert(Counter).values(name=name, value=select(func.count(model.id)).scalar_subquery()))
+
+
+def rebuild_aggregates(connection=None):
+    """
+    Recomputes every summary table from the base tables in one transaction: the caller's
+    when a connection is given (e.g. a migration's), otherwise a new session's.
+    """
+    if connection is None:
+        with get_db_session() as session:
+            _rebuild(session.connection())
+    else:
+        _rebuild(connection)
+    logger.info("Summary tables rebuilt")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if init_database():
+        rebuild_aggregates()
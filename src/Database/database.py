@@ -2,18 +2,42 @@ import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
+from sqlalchemy.dialects import postgresql, sqlite
 from .models import Base
+from .sqlite_mode import SQLiteWriter, configure_connections
+from src import metrics
 import logging
 from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+
+# Dialects whose insert() supports ON CONFLICT
+UPSERT_DIALECTS = {'postgresql': postgresql, 'sqlite': sqlite}
+
 class DatabaseManager:
     def __init__(self, database_url: str = None):
         if database_url is None:
             database_url = os.getenv("DATABASE_URL", "sqlite:///movie_recommender.db")
         
-        if database_url.startswith("sqlite"):
+        self.writer = None
+        if database_url.startswith("sqlite") and self._sqlite_production_mode(database_url):
+            # Readers share a pool of WAL connections; all writes go through one writer thread
+            connect_args = {"check_same_thread": False, "timeout": 20}
+            self.engine = create_engine(
+                database_url,
+                pool_size=SQLITE_READ_POOL_SIZE,
+                max_overflow=SQLITE_READ_POOL_SIZE,
+                connect_args=connect_args,
+                echo=False
+            )
+            configure_connections(self.engine)
+            writer_engine = create_engine(database_url, poolclass=StaticPool, connect_args=connect_args, echo=False)
+            configure_connections(writer_engine)
+            metrics.instrument_engine(writer_engine)
+            self.writer = SQLiteWriter(writer_engine)
+        elif database_url.startswith("sqlite"):
             self.engine = create_engine(
                 database_url,
                 poolclass=StaticPool,
@@ -32,8 +56,15 @@ class DatabaseManager:
                 echo=False
             )
         
+        metrics.instrument_engine(self.engine)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
+    @staticmethod
+    def _sqlite_production_mode(database_url):
+        """WAL mode needs a database file; SQLITE_MODE=shared keeps the single shared connection"""
+        in_memory = database_url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in database_url
+        return not in_memory and os.getenv("SQLITE_MODE", "production") == "production"
+
     def create_tables(self):
         """Create all tables"""
         try:
@@ -54,11 +85,12 @@ class DatabaseManager:
     
     @contextmanager
     def get_session(self):
-        """Getting database session with automatic cleanup"""
+        """Getting database session with automatic cleanup (timed as db.session, including the caller's block)"""
         session = self.SessionLocal()
         try:
-            yield session
-            session.commit()
+            with metrics.timer("db.session"):
+                yield session
+                session.commit()
         except Exception as e:
             session.rollback()
             logger.error(f"Database session error: {e}")
@@ -66,6 +98,21 @@ class DatabaseManager:
         finally:
             session.close()
     
+    def run_write(self, work):
+        """
+        Runs work(session) in a write transaction and returns its result. In SQLite production
+        mode it is queued to the writer thread and may share a commit with other writes.
+        """
+        with metrics.timer("db.write"):
+            if self.writer is not None:
+                try:
+                    return self.writer.submit(work)
+                except Exception as e:
+                    logger.error(f"Database write error: {e}")
+                    raise
+            with self.get_session() as session:
+                return work(session)
+
     def get_session_direct(self) -> Session:
         """Getting database session for direct use (but it will be closed!)"""
         return self.SessionLocal()
@@ -84,10 +131,11 @@ class DatabaseManager:
 db_manager = DatabaseManager()
 
 def init_database():
-    """Initializing database with tables"""
+    """Initializing database: applies pending schema migrations (see migrations.py)"""
+    from .migrations import migrate
     try:
-        db_manager.create_tables()
-        logger.info("Database initialized successfully")
+        version = migrate(db_manager.engine)
+        logger.info(f"Database initialized successfully (schema version {version})")
         return True  
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
@@ -98,6 +146,17 @@ def get_db_session():
     """Dependency function for getting database session"""
     return db_manager.get_session()
 
+
+def run_write(work):
+    """Runs work(session) as a write (see DatabaseManager.run_write)"""
+    return db_manager.run_write(work)
+
+
+def upsert_insert(session, model):
+    """Returns the dialect insert() for model, or None if the database has no ON CONFLICT"""
+    dialect = UPSERT_DIALECTS.get(session.get_bind().dialect.name)
+    return None if dialect is None else dialect.insert(model)
+
 # Testing database connection
 if __name__ == "__main__":
     print("Testing database connection...")
@@ -0,0 +1,150 @@
+"""
+Streaming exports of ratings, watchlists and feedback to CSV or Parquet.
+
+Rows are read in keyset windows over the primary key. Every window is its own short read
+transaction, and within it rows are streamed with yield_per (a server-side cursor on
+PostgreSQL), so neither the database nor the exporter holds more than one chunk at a time
+and no transaction spans the whole table. Rows written while an export runs may or may
+not be included.
+
+Parquet needs pyarrow (`pip install pyarrow`); CSV has no extra dependency.
+
+Usage:
+    python -m src.Database.export ratings --format parquet --output ratings.parquet
+"""
+
+import io
+import sys
+import logging
+import argparse
+import tempfile
+import importlib.util
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import select
+from .database import get_db_session
+from .models import Rating, WatchlistItem, Feedback
+
+logger = logging.getLogger(__name__)
+
+# Rows per fetch (and per CSV chunk / Parquet row group)
+CHUNK_SIZE = 10_000
+# Rows per read transaction
+WINDOW_SIZE = 100_000
+
+EXPORTS = {
+    'ratings': (Rating, (Rating.id, Rating.user_id, Rating.movie_id, Rating.rating, Rating.created_at)),
+    'watchlist': (WatchlistItem, (WatchlistItem.id, WatchlistItem.user_id, WatchlistItem.movie_id,
+                                  WatchlistItem.movie_title, WatchlistItem.added_at)),
+    'feedback': (Feedback, (Feedback.id, Feedback.user_id, Feedback.feedback_text, Feedback.submitted_at)),
+}
+FORMATS = ['csv', 'parquet']
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+
+def iter_chunks(name, chunk_size=CHUNK_SIZE, window_size=WINDOW_SIZE):
+    """Yields the rows of export `name` as DataFrames of at most chunk_size rows, ordered by id."""
+    model, columns = EXPORTS[name]
+    column_names = [column.key for column in columns]
+    last_id = None
+    while True:
+        statement = select(*columns).order_by(model.id).limit(window_size)
+        if last_id is not None:
+            statement = statement.where(model.id > last_id)
+        fetched = 0
+        with get_db_session() as session:
+            result = session.execute(statement.execution_options(yield_per=chunk_size))
+            for rows in result.partitions():
+                fetched += len(rows)
+                last_id = rows[-1].id
+                yield pd.DataFrame(rows, columns=column_names)
+        if fetched < window_size:
+            return
+
+
+def write_csv(chunks, f, column_names=None):
+    """Writes the chunks to a text file object with one header; returns the row count."""
+    count = 0
+    for chunk in chunks:
+        chunk.to_csv(f, index=False, header=count == 0)
+        count += len(chunk)
+    if count == 0 and column_names:
+        # Nothing to export: still write the header
+        pd.DataFrame(columns=column_names).to_csv(f, index=False)
+    return count
+
+
+def _arrow_schema(columns):
+    """Parquet schema from the column types, so every row group and an empty file agree."""
+    import pyarrow as pa
+
+    types = {str: pa.string(), int: pa.int64(), float: pa.float64(), bool: pa.bool_(), datetime: pa.timestamp('us')}
+    return pa.schema([(column.key, types[column.type.python_type]) for column in columns])
+
+
+def write_parquet(chunks, f, columns):
+    """
+    Writes every chunk as one row group to a path or binary file object; returns the row count.
+    columns are the exported SQLAlchemy columns, which give the schema.
+    """
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(columns)
+    count = 0
+    with pq.ParquetWriter(f, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            count += len(chunk)
+    return count
+
+
+def export(name, f, fmt='csv', chunk_size=CHUNK_SIZE, window_size=WINDOW_SIZE):
+    """Exports `name` ('ratings', 'watchlist' or 'feedback') to f and returns the row count."""
+    columns = EXPORTS[name][1]
+    chunks = iter_chunks(name, chunk_size, window_size)
+    if fmt == 'parquet':
+        return write_parquet(chunks, f, columns)
+    return write_csv(chunks, f, [column.key for column in columns])
+
+
+def export_to_tempfile(name, fmt='csv'):
+    """Exports `name` to an anonymous temporary file and returns it, opened for binary reading at the start."""
+    f = tempfile.TemporaryFile()
+    if fmt == 'parquet':
+        export(name, f, 'parquet')
+    else:
+        text = io.TextIOWrapper(f, encoding='utf-8', newline='')
+        export(name, text, 'csv')
+        text.flush()
+        text.detach()
+    f.seek(0)
+    return f
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a table to CSV or Parquet")
+    parser.add_argument('table', choices=sorted(EXPORTS))
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--output', default=None, help="Output file (default: stdout, CSV only)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows per fetch / row group")
+    parser.add_argument('--window-size', type=int, default=WINDOW_SIZE, help="Rows per read transaction")
+    args = parser.parse_args()
+    if args.format == 'parquet' and args.output is None:
+        parser.error("--output is required for Parquet")
+
+    logging.basicConfig(level=logging.INFO)
+    if args.output is None:
+        count = export(args.table, sys.stdout, 'csv', args.chunk_size, args.window_size)
+    elif args.format == 'parquet':
+        count = export(args.table, args.output, 'parquet', args.chunk_size, args.window_size)
+    else:
+        with open(args.output, 'w', newline='') as f:
+            count = export(args.table, f, 'csv', args.chunk_size, args.window_size)
+    logger.info(f"Exported {count:,} {args.table} rows")
+
+
+if __name__ == "__main__":
+    main()
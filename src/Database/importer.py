@@ -0,0 +1,225 @@
+"""
+Bulk import of MovieLens-style ratings (userId,movieId,rating,timestamp).
+
+The CSV is streamed in chunks, so memory stays flat whatever its size. Every chunk is written
+in one transaction: an executemany of INSERT ... ON CONFLICT on SQLite, COPY into a temporary
+table followed by one INSERT ... SELECT ... ON CONFLICT on PostgreSQL (psycopg2 or psycopg 3,
+other drivers use an executemany upsert). On those two, re-importing a file updates ratings in
+place instead of duplicating them.
+
+Usage:
+    python -m src.Database.importer ratings.csv --links links.csv --artifacts data/artifacts
+"""
+
+import io
+import os
+import time
+import uuid
+import logging
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+from .models import User, Rating
+from .database import init_database, run_write, upsert_insert
+from .aggregates import rebuild_aggregates
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 200_000
+# MovieLens stars (0.5-5) to the app's 1-10 scale
+RATING_SCALE = 2.0
+# External user ids map to stable users.id values, so a re-import finds the same users
+USER_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://movielens.org/users")
+RATING_COLUMNS = ['id', 'user_id', 'movie_id', 'rating', 'created_at']
+# PostgreSQL drivers with COPY support (SQLAlchemy 2.1 picks psycopg 3 for a plain postgresql:// URL)
+COPY_DRIVERS = ('psycopg2', 'psycopg')
+# How SQLAlchemy stores DateTime values in SQLite
+SQLITE_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def user_id_for(external_id):
+    return str(uuid.uuid5(USER_NAMESPACE, str(external_id)))
+
+
+def uuid4_strings(n):
+    """n random version-4 UUID strings, built with NumPy instead of one uuid.uuid4() call per row."""
+    raw = np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    digits = np.frombuffer(raw.tobytes().hex().encode(), dtype='S1').reshape(n, 32)
+    dashed = np.full((n, 36), b'-', dtype='S1')
+    for start, stop, offset in ((0, 8, 0), (8, 12, 1), (12, 16, 2), (16, 20, 3), (20, 32, 4)):
+        dashed[:, start + offset:stop + offset] = digits[:, start:stop]
+    return dashed.view('S36').ravel().astype('U36')
+
+
+def load_links(path):
+    """Returns a movieId -> tmdbId Series from a MovieLens links.csv."""
+    links = pd.read_csv(path, usecols=['movieId', 'tmdbId']).dropna()
+    return links.set_index('movieId')['tmdbId'].astype(np.int64)
+
+
+def prepare_chunk(chunk, links=None, movie_ids=None, scale=RATING_SCALE):
+    """
+    Maps a raw CSV chunk to ratings rows. Movies without a TMDB id, or outside movie_ids
+    when given, are dropped; the last rating wins when a chunk repeats a (user, movie) pair.
+    """
+    movies = chunk['movieId'] if links is None else chunk['movieId'].map(links)
+    keep = movies.notna()
+    if movie_ids is not None:
+        keep &= movies.isin(movie_ids)
+    chunk, movies = chunk[keep], movies[keep].astype(np.int64)
+
+    frame = pd.DataFrame({
+        'external_user': chunk['userId'].to_numpy(),
+        'movie_id': movies.to_numpy(),
+        'rating': (chunk['rating'].to_numpy(dtype=np.float64) * scale).clip(1, 10),
+        'created_at': pd.to_datetime(chunk['timestamp'].to_numpy(), unit='s'),
+    }).drop_duplicates(['external_user', 'movie_id'], keep='last')
+
+    # Sorted by user, consecutive rows land next to each other in the (user_id, movie_id) index
+    frame = frame.sort_values(['external_user', 'movie_id'], kind='stable')
+    users = frame['external_user'].unique()
+    user_ids = pd.Series([user_id_for(user) for user in users], index=users)
+    frame['user_id'] = frame['external_user'].map(user_ids).to_numpy()
+    frame['id'] = uuid4_strings(len(frame))
+    return frame
+
+
+def _insert_users(session, external_ids):
+    now = datetime.utcnow()
+    rows = [
+        {'id': user_id_for(user), 'username': f"movielens_{user}", 'email': f"movielens_{user}@movielens.invalid",
+         # Not a valid sha256 hex digest, so imported users cannot log in
+         'password_hash': '!', 'created_at': now, 'updated_at': now, 'is_active': True, 'is_admin': False}
+        for user in external_ids
+    ]
+    statement = upsert_insert(session, User)
+    if statement is None:
+        session.execute(insert(User), rows)
+    else:
+        session.execute(statement.on_conflict_do_nothing(), rows)
+
+
+def _executemany_ratings(session, frame):
+    """SQLite: one DB-API executemany over plain tuples, skipping per-row parameter processing."""
+    rows = zip(frame['id'].tolist(), frame['user_id'].tolist(), frame['movie_id'].tolist(),
+               frame['rating'].tolist(), frame['created_at'].dt.strftime(SQLITE_DATETIME_FORMAT).tolist())
+    session.connection().exec_driver_sql(
+        f"INSERT INTO ratings ({', '.join(RATING_COLUMNS)}) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (user_id, movie_id) DO UPDATE SET rating = excluded.rating, created_at = excluded.created_at",
+        list(rows)
+    )
+
+
+def _insert_ratings(session, frame):
+    """
+    Other databases and PostgreSQL drivers without COPY: Core executemany, as an upsert where the
+    dialect has ON CONFLICT (otherwise re-imported pairs fail the batch).
+    """
+    rows = frame[RATING_COLUMNS].to_dict('records')
+    statement = upsert_insert(session, Rating)
+    if statement is None:
+        session.execute(insert(Rating), rows)
+        return
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[Rating.user_id, Rating.movie_id],
+        set_={'rating': statement.excluded.rating, 'created_at': statement.excluded.created_at}
+    ), rows)
+
+
+def _copy_ratings(session, frame):
+    """
+    PostgreSQL with psycopg2 or psycopg 3: COPY the chunk into a temporary table, then merge it
+    with one statement. The two drivers expose COPY differently (copy_expert vs copy).
+    """
+    buffer = io.StringIO()
+    frame[RATING_COLUMNS].to_csv(buffer, index=False, header=False)
+    copy_sql = f"COPY ratings_import ({', '.join(RATING_COLUMNS)}) FROM STDIN WITH CSV"
+    driver = session.get_bind().dialect.driver
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.execute("CREATE TEMPORARY TABLE IF NOT EXISTS ratings_import "
+                       "(LIKE ratings INCLUDING DEFAULTS) ON COMMIT DELETE ROWS")
+        if driver == 'psycopg2':
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+        else:
+            with cursor.copy(copy_sql) as copy:
+                copy.write(buffer.getvalue())
+        cursor.execute(
+            f"INSERT INTO ratings ({', '.join(RATING_COLUMNS)}) "
+            f"SELECT {', '.join(RATING_COLUMNS)} FROM ratings_import "
+            "ON CONFLICT (user_id, movie_id) DO UPDATE SET rating = EXCLUDED.rating, created_at = EXCLUDED.created_at"
+        )
+    finally:
+        cursor.close()
+
+
+def import_ratings(path, links_path=None, movie_ids=None, chunk_size=CHUNK_SIZE, scale=RATING_SCALE, rebuild=True):
+    """Streams a ratings CSV into the database and returns {'rows', 'imported', 'users', 'seconds'}."""
+    links = load_links(links_path) if links_path else None
+    movie_ids = None if movie_ids is None else pd.Index(movie_ids)
+    known_users = set()
+    rows = imported = 0
+    start = time.perf_counter()
+
+    reader = pd.read_csv(path, usecols=['userId', 'movieId', 'rating', 'timestamp'], chunksize=chunk_size,
+                         dtype={'userId': np.int64, 'movieId': np.int64, 'rating': np.float64, 'timestamp': np.int64})
+    for chunk in reader:
+        frame = prepare_chunk(chunk, links, movie_ids, scale)
+        new_users = [user for user in frame['external_user'].unique().tolist() if user not in known_users]
+
+        def work(session):
+            if new_users:
+                _insert_users(session, new_users)
+            if len(frame):
+                dialect = session.get_bind().dialect
+                if dialect.name == 'postgresql' and dialect.driver in COPY_DRIVERS:
+                    _copy_ratings(session, frame)
+                elif dialect.name == 'sqlite':
+                    _executemany_ratings(session, frame)
+                else:
+                    _insert_ratings(session, frame)
+
+        run_write(work)
+        known_users.update(new_users)
+        rows += len(chunk)
+        imported += len(frame)
+        elapsed = time.perf_counter() - start
+        logger.info(f"{rows:,} rows read, {imported:,} imported, {len(known_users):,} users "
+                    f"({rows / elapsed:,.0f} rows/s)")
+
+    if rebuild:
+        rebuild_aggregates()
+    return {'rows': rows, 'imported': imported, 'users': len(known_users), 'seconds': time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import a MovieLens-style ratings CSV")
+    parser.add_argument('ratings', help="CSV with userId,movieId,rating,timestamp columns")
+    parser.add_argument('--links', default=None,
+                        help="MovieLens links.csv mapping movieId to tmdbId (without it movieId must be a TMDB id)")
+    parser.add_argument('--artifacts', default=None, help="Only import movies in this artifact directory's catalog")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows per batch/transaction")
+    parser.add_argument('--scale', type=float, default=RATING_SCALE, help="Multiplier to the 1-10 rating range")
+    parser.add_argument('--no-aggregates', action='store_true', help="Skip rebuilding the admin summary tables")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not init_database():
+        raise SystemExit("Database initialization failed")
+    movie_ids = None
+    if args.artifacts:
+        from src.artifacts import load_artifacts
+        movie_ids = load_artifacts(args.artifacts).movies['movie_id'].to_numpy(dtype=np.int64)
+    stats = import_ratings(args.ratings, args.links, movie_ids, args.chunk_size, args.scale,
+                           rebuild=not args.no_aggregates)
+    logger.info(f"Imported {stats['imported']:,} of {stats['rows']:,} ratings for {stats['users']:,} users "
+                f"in {stats['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
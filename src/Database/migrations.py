@@ -0,0 +1,121 @@
+"""
+Versioned schema migrations. Applied versions are recorded in the schema_version table,
+so init_database only runs the pending ones. The pending steps and their version rows run
+in one transaction under a lock, so processes starting together never apply a step twice.
+Steps are also idempotent, for databases without transactional DDL.
+
+Usage:
+    python -m src.Database.migrations
+"""
+
+import logging
+from contextlib import contextmanager
+from sqlalchemy import select, insert, delete, func, text
+from .models import Base, Rating, WatchlistItem, Feedback, MovieRatingStats, UserActivity, Counter, SchemaVersion
+from .aggregates import rebuild_aggregates
+
+logger = logging.getLogger(__name__)
+
+# Key of the PostgreSQL advisory lock serializing migrations (any constant bigint)
+MIGRATION_LOCK_KEY = 72_617_310
+
+
+def _baseline(connection):
+    Base.metadata.create_all(bind=connection)
+
+
+def _remove_duplicates(connection, model, timestamp):
+    """Keeps the newest row of every (user_id, movie_id) pair; returns the number of rows removed."""
+    pairs = connection.execute(
+        select(model.user_id, model.movie_id)
+        .group_by(model.user_id, model.movie_id)
+        .having(func.count(model.id) > 1)
+    ).all()
+    removed = 0
+    for user_id, movie_id in pairs:
+        ids = connection.execute(
+            select(model.id)
+            .where(model.user_id == user_id, model.movie_id == movie_id)
+            .order_by(timestamp.desc(), model.id.desc())
+        ).scalars().all()
+        connection.execute(delete(model).where(model.id.in_(ids[1:])))
+        removed += len(ids) - 1
+    return removed
+
+
+def _user_movie_indexes(connection):
+    for model, timestamp in ((Rating, Rating.created_at), (WatchlistItem, WatchlistItem.added_at)):
+        removed = _remove_duplicates(connection, model, timestamp)
+        if removed:
+            logger.warning(f"Removed {removed} duplicate rows from {model.__tablename__}")
+        for index in model.__table__.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def _summary_tables(connection):
+    Base.metadata.create_all(bind=connection, tables=[MovieRatingStats.__table__, UserActivity.__table__,
+                                                      Counter.__table__])
+    for index in Feedback.__table__.indexes:
+        index.create(connection, checkfirst=True)
+    rebuild_aggregates(connection)
+
+
+# (version, description, step); append new steps, never edit applied ones
+MIGRATIONS = [
+    (1, "Baseline schema", _baseline),
+    (2, "Unique (user_id, movie_id) and per-user time indexes on ratings and watchlist items", _user_movie_indexes),
+    (3, "Admin summary tables and feedback submitted_at index", _summary_tables),
+]
+
+
+def current_version(connection):
+    return connection.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+
+
+@contextmanager
+def _locked_transaction(engine):
+    """
+    Yields a connection in a transaction that holds the migration lock until it commits, so
+    processes starting together apply the migrations once: BEGIN IMMEDIATE takes SQLite's
+    write lock up front, PostgreSQL gets a transaction-scoped advisory lock.
+    """
+    if engine.dialect.name == 'sqlite':
+        # pysqlite would defer BEGIN until the first write; issue it ourselves
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.exec_driver_sql("ROLLBACK")
+                raise
+            connection.exec_driver_sql("COMMIT")
+    else:
+        with engine.begin() as connection:
+            if engine.dialect.name == 'postgresql':
+                connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': MIGRATION_LOCK_KEY})
+            yield connection
+
+
+def migrate(engine):
+    """
+    Applies the pending migrations in order, in one transaction with their schema_version
+    rows, and returns the resulting schema version.
+    """
+    with _locked_transaction(engine) as connection:
+        SchemaVersion.__table__.create(bind=connection, checkfirst=True)
+        # Read under the lock: a process that waited sees the versions the other one applied
+        version = current_version(connection)
+        for step_version, description, step in MIGRATIONS:
+            if step_version <= version:
+                continue
+            logger.info(f"Applying migration {step_version}: {description}")
+            step(connection)
+            connection.execute(insert(SchemaVersion).values(version=step_version, description=description))
+            version = step_version
+    return version
+
+if __name__ == "__main__":
+    from .database import db_manager
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"Schema version {migrate(db_manager.engine)}")
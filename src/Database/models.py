@@ -1,5 +1,5 @@
 from sqlalchemy import (Column, Integer, String, DateTime, Boolean, 
-                        ForeignKey, Float, Text)
+                        ForeignKey, Float, Text, Index)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -35,6 +35,12 @@ class Rating(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     user = relationship("User", back_populates="ratings")
 
+    __table_args__ = (
+        # One rating per user and movie; also the conflict target of UserManager.rate_movie
+        Index("ix_ratings_user_movie", "user_id", "movie_id", unique=True),
+        Index("ix_ratings_user_created", "user_id", "created_at"),
+    )
+
 class WatchlistItem(Base):
     __tablename__ = "watchlist_items"
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -44,10 +50,44 @@ class WatchlistItem(Base):
     added_at = Column(DateTime, default=datetime.utcnow)
     user = relationship("User", back_populates="watchlist_items")
 
+    __table_args__ = (
+        Index("ix_watchlist_user_movie", "user_id", "movie_id", unique=True),
+        Index("ix_watchlist_user_added", "user_id", "added_at"),
+    )
+
 class Feedback(Base):
     __tablename__ = "feedback"
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
     feedback_text = Column(Text, nullable=False)
-    submitted_at = Column(DateTime, default=datetime.utcnow)
+    submitted_at = Column(DateTime, default=datetime.utcnow, index=True)
     user = relationship("User", back_populates="feedbacks")
+
+# Summary tables, kept in step with the tables above by the UserManager write paths
+# (see src/Database/aggregates.py) so the admin dashboard never scans ratings or feedback
+
+class MovieRatingStats(Base):
+    __tablename__ = "movie_rating_stats"
+    movie_id = Column(Integer, primary_key=True, autoincrement=False)
+    rating_count = Column(Integer, nullable=False, default=0, index=True)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+
+class UserActivity(Base):
+    __tablename__ = "user_activity"
+    user_id = Column(String(36), ForeignKey("users.id"), primary_key=True)
+    rating_count = Column(Integer, nullable=False, default=0, index=True)
+    feedback_count = Column(Integer, nullable=False, default=0)
+
+class Counter(Base):
+    """Global row counts, one row per name ('users', 'ratings', 'feedback')"""
+    __tablename__ = "counters"
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class SchemaVersion(Base):
+    """One row per migration applied (see src/Database/migrations.py)"""
+    __tablename__ = "schema_version"
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String(255), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
@@ -2,8 +2,10 @@ import hashlib
 from datetime import datetime
 from typing import Optional, Dict, Any
 from sqlalchemy import and_, or_
-from .models import User, Feedback
-from .database import get_db_session
+from .models import User, Feedback, Rating, WatchlistItem
+from .database import get_db_session, run_write, upsert_insert
+from .aggregates import record_rating, record_feedback, record_user
+from src.result_cache import invalidate_user
 import logging
 
 logger = logging.getLogger(__name__)
@@ -38,26 +40,28 @@ class UserManager:
 
     def create_user(self, username: str, email: str, password: str,
                    first_name: str = None, last_name: str = None, is_admin: bool = False) -> Optional[Dict[str, Any]]:
+        def work(session):
+            existing_user = session.query(User).filter(
+                or_(User.username == username, User.email == email)
+            ).first()
+            if existing_user:
+                logger.warning(f"User with username {username} or email {email} already exists")
+                return None
+
+            new_user = User(
+                username=username,
+                email=email,
+                password_hash=self.hash_password(password),
+                first_name=first_name,
+                last_name=last_name,
+                is_admin=is_admin
+            )
+            session.add(new_user)
+            record_user(session)
+            session.flush()
+            return self._user_to_dict(new_user)
         try:
-            with get_db_session() as session:
-                existing_user = session.query(User).filter(
-                    or_(User.username == username, User.email == email)
-                ).first()
-                if existing_user:
-                    logger.warning(f"User with username {username} or email {email} already exists")
-                    return None
-
-                new_user = User(
-                    username=username,
-                    email=email,
-                    password_hash=self.hash_password(password),
-                    first_name=first_name,
-                    last_name=last_name,
-                    is_admin=is_admin
-                )
-                session.add(new_user)
-                session.commit()
-                return self._user_to_dict(new_user)
+            return run_write(work)
         except Exception as e:
             logger.error(f"Error creating user: {e}")
             return None
@@ -84,45 +88,45 @@ class UserManager:
 
 
     def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
-        try:
-            with get_db_session() as session:
-                user = session.query(User).filter(
-                    and_(
-                        or_(User.username == username, User.email == username),
-                        User.is_active == True
-                    )
-                ).first()
+        def work(session):
+            user = session.query(User).filter(
+                and_(
+                    or_(User.username == username, User.email == username),
+                    User.is_active == True
+                )
+            ).first()
 
-                if user and self.verify_password(password, user.password_hash):
-                    user.last_login = datetime.utcnow()
-                    session.commit()
-                    return self._user_to_dict(user)
+            if user and self.verify_password(password, user.password_hash):
+                user.last_login = datetime.utcnow()
+                return self._user_to_dict(user)
 
-                logger.warning(f"Authentication failed for user {username}")
-                return None
+            logger.warning(f"Authentication failed for user {username}")
+            return None
+        try:
+            return run_write(work)
         except Exception as e:
             logger.error(f"Error authenticating user: {e}")
             return None
             
     def update_user_profile(self, user_id: str, new_username: str = None, new_email: str = None) -> (bool, str):
-        try:
-            with get_db_session() as session:
-                user = session.query(User).get(user_id)
-                if not user:
-                    return False, "User not found."
-
-                if new_username and new_username != user.username:
-                    if session.query(User).filter(User.username == new_username).first():
-                        return False, "Username already taken."
-                    user.username = new_username
-
-                if new_email and new_email != user.email:
-                    if session.query(User).filter(User.email == new_email).first():
-                        return False, "Email already in use."
-                    user.email = new_email
+        def work(session):
+            user = session.query(User).get(user_id)
+            if not user:
+                return False, "User not found."
+
+            if new_username and new_username != user.username:
+                if session.query(User).filter(User.username == new_username).first():
+                    return False, "Username already taken."
+                user.username = new_username
+
+            if new_email and new_email != user.email:
+                if session.query(User).filter(User.email == new_email).first():
+                    return False, "Email already in use."
+                user.email = new_email
                 
-                session.commit()
-                return True, "Profile updated successfully!"
+            return True, "Profile updated successfully!"
+        try:
+            return run_write(work)
         except Exception as e:
             logger.error(f"Error updating profile for user {user_id}: {e}")
             return False, "An error occurred during update."
@@ -130,15 +134,106 @@ class UserManager:
     def submit_feedback(self, user_id: str, feedback_text: str) -> bool:
         if not feedback_text:
             return False
+        def work(session):
+            new_feedback = Feedback(
+                user_id=user_id,
+                feedback_text=feedback_text
+            )
+            session.add(new_feedback)
+            record_feedback(session, user_id)
+            return True
         try:
-            with get_db_session() as session:
-                new_feedback = Feedback(
-                    user_id=user_id,
-                    feedback_text=feedback_text
+            return run_write(work)
+        except Exception as e:
+            logger.error(f"Error submitting feedback for user {user_id}: {e}")
+            return False
+
+    def rate_movie(self, user_id: str, movie_id: int, rating: float) -> bool:
+        """
+        Inserts or updates the user's rating for a movie and moves the summary tables by the
+        difference, in one transaction. A first rating is a single INSERT ... ON CONFLICT DO NOTHING;
+        a re-rating then reads the old value under a row lock to know the difference.
+        """
+        rating = float(rating)
+        def work(session):
+            statement = upsert_insert(session, Rating)
+            if statement is not None:
+                result = session.execute(
+                    statement.values(user_id=user_id, movie_id=movie_id, rating=rating)
+                    .on_conflict_do_nothing(index_elements=[Rating.user_id, Rating.movie_id])
                 )
-                session.add(new_feedback)
-                session.commit()
+                if result.rowcount == 1:
+                    record_rating(session, user_id, movie_id, 1, rating)
+                    return True
+
+            existing = (session.query(Rating).filter_by(user_id=user_id, movie_id=movie_id)
+                        .with_for_update().first())
+            if existing is None:
+                session.add(Rating(user_id=user_id, movie_id=movie_id, rating=rating))
+                record_rating(session, user_id, movie_id, 1, rating)
+            else:
+                record_rating(session, user_id, movie_id, 0, rating - existing.rating)
+                existing.rating = rating
+            return True
+        try:
+            result = run_write(work)
+            invalidate_user(user_id)
+            return result
+        except Exception as e:
+            logger.error(f"Error rating movie {movie_id} for user {user_id}: {e}")
+            return False
+
+    def add_to_watchlist(self, user_id: str, movie_id: int, movie_title: str) -> Optional[bool]:
+        """
+        Adds a movie to the user's watchlist in one INSERT ... ON CONFLICT statement.
+        Returns True if it was added, False if it was already there and None on error.
+        """
+        def work(session):
+            statement = upsert_insert(session, WatchlistItem)
+            if statement is None:
+                if session.query(WatchlistItem).filter_by(user_id=user_id, movie_id=movie_id).first():
+                    return False
+                session.add(WatchlistItem(user_id=user_id, movie_id=movie_id, movie_title=movie_title))
                 return True
+
+            # DO NOTHING rather than DO UPDATE, so the row count tells a new item from an existing one
+            statement = statement.values(user_id=user_id, movie_id=movie_id, movie_title=movie_title)
+            result = session.execute(statement.on_conflict_do_nothing(
+                index_elements=[WatchlistItem.user_id, WatchlistItem.movie_id]
+            ))
+            return result.rowcount == 1
+        try:
+            result = run_write(work)
+            invalidate_user(user_id)
+            return result
         except Exception as e:
-            logger.error(f"Error submitting feedback for user {user_id}: {e}")
+            logger.error(f"Error adding movie {movie_id} to watchlist for user {user_id}: {e}")
+            return None
+
+    def remove_from_watchlist(self, user_id: str, movie_id: int) -> bool:
+        def work(session):
+            session.query(WatchlistItem).filter_by(user_id=user_id, movie_id=movie_id).delete()
+            return True
+        try:
+            result = run_write(work)
+            invalidate_user(user_id)
+            return result
+        except Exception as e:
+            logger.error(f"Error removing movie {movie_id} from watchlist for user {user_id}: {e}")
+            return False
+
+    def delete_rating(self, user_id: str, movie_id: int) -> bool:
+        def work(session):
+            existing = (session.query(Rating).filter_by(user_id=user_id, movie_id=movie_id)
+                        .with_for_update().first())
+            if existing is not None:
+                record_rating(session, user_id, movie_id, -1, -existing.rating)
+                session.delete(existing)
+            return True
+        try:
+            result = run_write(work)
+            invalidate_user(user_id)
+            return result
+        except Exception as e:
+            logger.error(f"Error deleting rating of movie {movie_id} for user {user_id}: {e}")
             return False
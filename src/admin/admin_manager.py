@@ -1,12 +1,13 @@
 import pandas as pd
-from sqlalchemy import func, desc
-from sqlalchemy.orm import joinedload
+from sqlalchemy import desc, select, and_, or_
 from src.Database.database import get_db_session
-from src.Database.models import User, Rating, Feedback
+from src.Database.models import User, Feedback, MovieRatingStats, UserActivity, Counter
 import logging
 
 logger = logging.getLogger(__name__)
 
+FEEDBACK_PAGE_SIZE = 20
+
 class AdminManager:
     """
     It handles fetching data for the admin dashboard.
@@ -14,18 +15,16 @@ class AdminManager:
 
     def get_key_metrics(self):
         """
-        key metrics fetched : total users, total ratings, and total feedback.
+        key metrics fetched : total users, total ratings, and total feedback (from the counters table).
         """
         try:
             with get_db_session() as session:
-                total_users = session.query(func.count(User.id)).scalar()
-                total_ratings = session.query(func.count(Rating.id)).scalar()
-                total_feedback = session.query(func.count(Feedback.id)).scalar()
+                counters = dict(session.query(Counter.name, Counter.value).all())
                 
                 return {
-                    "total_users": total_users,
-                    "total_ratings": total_ratings,
-                    "total_feedback": total_feedback,
+                    "total_users": counters.get('users', 0),
+                    "total_ratings": counters.get('ratings', 0),
+                    "total_feedback": counters.get('feedback', 0),
                 }
         except Exception as e:
             logger.error(f"Error fetching key metrics: {e}")
@@ -33,17 +32,14 @@ class AdminManager:
 
     def get_most_rated_movies(self, movies_df, limit=10):
         """
-        It fetches the most rated movies and joins with movie titles.
+        It fetches the most rated movies from the per-movie summary and joins with movie titles.
         """
         try:
             with get_db_session() as session:
                 most_rated = (
-                    session.query(
-                        Rating.movie_id,
-                        func.count(Rating.movie_id).label("rating_count")
-                    )
-                    .group_by(Rating.movie_id)
-                    .order_by(desc("rating_count"))
+                    session.query(MovieRatingStats.movie_id, MovieRatingStats.rating_count, MovieRatingStats.rating_sum)
+                    .filter(MovieRatingStats.rating_count > 0)
+                    .order_by(desc(MovieRatingStats.rating_count))
                     .limit(limit)
                     .all()
                 )
@@ -51,7 +47,8 @@ class AdminManager:
                 if not most_rated:
                     return pd.DataFrame()
 
-                most_rated_df = pd.DataFrame(most_rated, columns=['movie_id', 'rating_count'])
+                most_rated_df = pd.DataFrame(most_rated, columns=['movie_id', 'rating_count', 'rating_sum'])
+                most_rated_df['average_rating'] = (most_rated_df.pop('rating_sum') / most_rated_df['rating_count']).round(2)
                 
                 merged_df = pd.merge(
                     most_rated_df,
@@ -65,27 +62,34 @@ class AdminManager:
             logger.error(f"Error fetching most rated movies: {e}")
             return pd.DataFrame()
 
-    def get_all_feedback(self):
+    def get_feedback_page(self, cursor=None, page_size=FEEDBACK_PAGE_SIZE):
         """
-        It retrieves all feedback entries with all needed data fully loaded.
+        It retrieves one page of feedback, newest first, as (entries, next_cursor).
+        The cursor is the (submitted_at, id) of the previous page's last entry.
         """
         try:
             with get_db_session() as session:
-                feedback_data = (
-                    session.query(Feedback)
-                    .options(joinedload(Feedback.user))
-                    .order_by(desc(Feedback.submitted_at))
-                    .all()
+                statement = (
+                    select(Feedback.id, User.username, Feedback.submitted_at, Feedback.feedback_text)
+                    .join(User, User.id == Feedback.user_id)
                 )
-                
-                feedback_list = [
-                    (f.id, f.user.username, f.submitted_at, f.feedback_text)
-                    for f in feedback_data
-                ]
-                return feedback_list
+                if cursor is not None:
+                    last_submitted_at, last_id = cursor
+                    statement = statement.where(or_(
+                        Feedback.submitted_at < last_submitted_at,
+                        and_(Feedback.submitted_at == last_submitted_at, Feedback.id < last_id)
+                    ))
+                statement = statement.order_by(desc(Feedback.submitted_at), desc(Feedback.id)).limit(page_size + 1)
+                feedback_list = [tuple(row) for row in session.execute(statement)]
+
+                next_cursor = None
+                if len(feedback_list) > page_size:
+                    feedback_list = feedback_list[:page_size]
+                    next_cursor = (feedback_list[-1][2], feedback_list[-1][0])
+                return feedback_list, next_cursor
         except Exception as e:
             logger.error(f"Error fetching feedback: {e}")
-            return []
+            return [], None
 
     def get_user_activity(self, limit=10):
         """
@@ -94,13 +98,10 @@ class AdminManager:
         try:
             with get_db_session() as session:
                 user_activity = (
-                    session.query(
-                        User.username,
-                        func.count(Rating.id).label("rating_count")
-                    )
-                    .join(Rating, User.id == Rating.user_id)
-                    .group_by(User.username)
-                    .order_by(desc("rating_count"))
+                    session.query(User.username, UserActivity.rating_count)
+                    .join(User, User.id == UserActivity.user_id)
+                    .filter(UserActivity.rating_count > 0)
+                    .order_by(desc(UserActivity.rating_count))
                     .limit(limit)
                     .all()
                 )
@@ -108,5 +109,3 @@ class AdminManager:
         except Exception as e:
             logger.error(f"Error fetching user activity: {e}")
             return pd.DataFrame()
-
-
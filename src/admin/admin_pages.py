@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 from .admin_manager import AdminManager
+from src import metrics as latency
+from src.Database import export
 from src.recommender import movies
 
 def admin_dashboard_page():
@@ -46,12 +48,75 @@ def admin_dashboard_page():
 
     st.markdown("---")
 
+    # Latency Section (this process only, since it started or was last reset)
+    st.header("⏱️ Latency")
+    if not latency.ENABLED:
+        st.info("Instrumentation is disabled (METRICS_ENABLED=0).")
+    else:
+        operations, counters, slow_queries = latency.snapshot()
+        if operations:
+            latency_df = pd.DataFrame.from_dict(operations, orient='index').round(2)
+            latency_df.index.name = 'operation'
+            st.dataframe(latency_df, use_container_width=True)
+        else:
+            st.info("No timings recorded yet.")
+
+        columns = st.columns(5)
+        for col, label, prefix in zip(columns, ("TMDB memory cache hit ratio", "TMDB disk cache hit ratio",
+                                                "Recommendation cache hit ratio", "Personalized cache hit ratio"),
+                                      ("tmdb.memory_cache", "tmdb.disk_cache", "recommend_cache", "user_cache")):
+            ratio = latency.hit_ratio(counters, prefix)
+            col.metric(label, "n/a" if ratio is None else f"{ratio:.1%}")
+        batches = counters.get("db.write_batches", 0)
+        columns[4].metric("Writes per commit", f"{counters.get('db.write_jobs', 0) / batches:.1f}" if batches else "n/a")
+
+        st.subheader(f"🐢 Slow queries (≥ {latency.SLOW_QUERY_MS:.0f} ms)")
+        if slow_queries:
+            st.dataframe(pd.DataFrame(slow_queries), use_container_width=True)
+        else:
+            st.info("No slow queries recorded.")
+        if st.button("Reset latency data"):
+            latency.reset()
+            st.rerun()
+
+    st.markdown("---")
+
     # User Feedback Section
     st.header("✉️ User Feedback")
-    feedback_list = admin_manager.get_all_feedback()
+    # One keyset cursor per page visited, so Previous is a pop
+    cursors = st.session_state.setdefault('feedback_cursors', [None])
+    feedback_list, next_cursor = admin_manager.get_feedback_page(cursors[-1])
     if feedback_list:
         for _, username, submitted_at, feedback_text in feedback_list:
             with st.expander(f"Feedback from **{username}** on *{submitted_at.strftime('%Y-%m-%d %H:%M')}*"):
                 st.write(feedback_text)
+        prev_col, _, next_col = st.columns([1, 4, 1])
+        with prev_col:
+            if len(cursors) > 1 and st.button("⬅️ Previous", key="feedback_prev"):
+                cursors.pop()
+                st.rerun()
+        with next_col:
+            if next_cursor is not None and st.button("Next ➡️", key="feedback_next"):
+                cursors.append(next_cursor)
+                st.rerun()
     else:
         st.info("No feedback has been submitted yet.")
+
+    st.markdown("---")
+
+    # Data Export Section (the file is only built when the button is clicked)
+    st.header("📦 Data Export")
+    col1, col2, col3 = st.columns([2, 2, 2])
+    table = col1.selectbox("Table", sorted(export.EXPORTS), key="export_table")
+    formats = export.FORMATS if export.PARQUET_AVAILABLE else ['csv']
+    fmt = col2.radio("Format", formats, horizontal=True, key="export_format")
+    with col3:
+        st.download_button(
+            f"⬇️ Download {table}.{fmt}",
+            data=lambda: export.export_to_tempfile(table, fmt),
+            file_name=f"{table}.{fmt}",
+            mime="text/csv" if fmt == 'csv' else "application/vnd.apache.parquet",
+            on_click="ignore",
+        )
+    if not export.PARQUET_AVAILABLE:
+        st.caption("Install pyarrow to export Parquet.")
@@ -0,0 +1,186 @@
+"""
+Approximate nearest neighbors over the tag vectors with an IVF coarse quantizer.
+
+Usage:
+    python -m src.ann data/artifacts --k 10 --sample 500
+"""
+
+import time
+import logging
+import argparse
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+from src.neighbors import DEFAULT_K, top_k
+from src.similarity import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROBES = 8
+MAX_PROBES = 256
+KMEANS_ITERATIONS = 10
+# Rows sampled per list when training the centroids
+TRAINING_ROWS_PER_LIST = 50
+
+
+class IVFIndex:
+    """
+    An inverted-file index over L2-normalized sparse tag vectors: spherical k-means splits the
+    catalog into lists around unit centroids, and a query scans only the `probes` lists whose
+    centroids are closest to it, reranking those rows by exact cosine. Memory is the tag vectors,
+    the centroids and one row id per movie, so it grows with N·d rather than N².
+    """
+
+    def __init__(self, vectors, centroids, order, offsets, probes=DEFAULT_PROBES, k=DEFAULT_K):
+        self.vectors = vectors
+        # (n_lists, d) unit centroids
+        self.centroids = centroids
+        # Rows grouped by list; list i holds order[offsets[i]:offsets[i + 1]]
+        self.order = order
+        self.offsets = offsets
+        self.probes = probes
+        self.k = k
+
+    @property
+    def n_lists(self):
+        return self.centroids.shape[0]
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @staticmethod
+    def _assign(vectors, centroids, block_size=65536):
+        """Index of the closest centroid for every row, a block of rows at a time."""
+        assignments = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], block_size):
+            stop = min(start + block_size, vectors.shape[0])
+            assignments[start:stop] = np.asarray(vectors[start:stop] @ centroids.T).argmax(axis=1)
+        return assignments
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, probes=DEFAULT_PROBES, iterations=KMEANS_ITERATIONS, seed=0):
+        vectors = normalize_rows(vectors)
+        n = vectors.shape[0]
+        n_lists = min(n_lists or max(int(np.sqrt(n)), 1), n)
+        rng = np.random.default_rng(seed)
+
+        # Spherical k-means on a sample: assign to the closest centroid, re-normalize the means
+        sample = vectors[np.sort(rng.choice(n, size=min(n, TRAINING_ROWS_PER_LIST * n_lists), replace=False))]
+        centroids = sample[rng.choice(sample.shape[0], size=n_lists, replace=False)].toarray()
+        for _ in range(iterations):
+            assignments = cls._assign(sample, centroids)
+            members = csr_matrix(
+                (np.ones(len(assignments), dtype=np.float32), (assignments, np.arange(len(assignments)))),
+                shape=(n_lists, sample.shape[0])
+            )
+            sums = np.asarray((members @ sample).todense())
+            empty = np.diff(members.indptr) == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize(sums)
+        centroids = centroids.astype(np.float32)
+
+        assignments = cls._assign(vectors, centroids)
+        order = np.argsort(assignments, kind='stable').astype(np.int32)
+        offsets = np.searchsorted(assignments[order], np.arange(n_lists + 1)).astype(np.int64)
+        return cls(vectors, centroids, order, offsets, probes=probes)
+
+    @classmethod
+    def from_artifacts(cls, artifacts, probes=None):
+        ann = artifacts.manifest['metadata'].get('ann', {})
+        return cls(
+            artifacts.sparse('tags'),
+            artifacts['ann_centroids'],
+            artifacts['ann_order'],
+            artifacts['ann_offsets'],
+            probes=ann.get('probes', DEFAULT_PROBES) if probes is None else probes,
+        )
+
+    def to_arrays(self):
+        return {'ann_centroids': self.centroids, 'ann_order': self.order, 'ann_offsets': self.offsets}
+
+    def candidates(self, vector):
+        """Rows in the lists whose centroids are closest to a (1, d) normalized query vector."""
+        centroid_scores = np.asarray(vector @ self.centroids.T).ravel()
+        probes = top_k(centroid_scores, self.probes)
+        return np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in probes])
+
+    def query(self, vector, k, exclude=None):
+        """Returns (ids, scores) of the approximate k nearest rows to a (1, d) normalized vector."""
+        candidates = self.candidates(vector)
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        scores = np.asarray((self.vectors[candidates] @ vector.T).todense()).ravel()
+        top = top_k(scores, k)
+        return candidates[top].astype(np.int32), scores[top].astype(np.float32)
+
+    def neighbors(self, row, k):
+        """Same contract as NeighborIndex.neighbors, answered from the inverted lists."""
+        return self.query(self.vectors[row], k, exclude=row)
+
+    def neighbor_lists(self, rows, k=None):
+        """(len(rows), k) neighbor ids and scores, padded with -1/0 where the probed lists ran short."""
+        k = k or self.k
+        ids = np.full((len(rows), k), -1, dtype=np.int32)
+        scores = np.zeros((len(rows), k), dtype=np.float32)
+        for i, row in enumerate(rows):
+            row_ids, row_scores = self.neighbors(row, k)
+            ids[i, :len(row_ids)] = row_ids
+            scores[i, :len(row_scores)] = row_scores
+        return ids, scores
+
+
+def exact_neighbors(vectors, rows, k):
+    """Brute-force top-k cosine neighbors of a few rows, used as ground truth."""
+    scores = (vectors[rows] @ vectors.T).toarray()
+    scores[np.arange(len(rows)), rows] = -np.inf
+    return [set(top_k(row_scores, k).tolist()) for row_scores in scores]
+
+
+def evaluate_recall(index, k=10, sample=500, seed=0, truth=None):
+    """
+    Returns (recall, rows, truth): the mean recall@k of the index against exact search over a random
+    sample of rows. Pass truth back in to re-evaluate other settings without recomputing it.
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(index), size=min(sample, len(index)), replace=False)
+    if truth is None:
+        truth = exact_neighbors(index.vectors, rows, k)
+    hits = 0
+    for row, expected in zip(rows, truth):
+        found, _ = index.neighbors(row, k)
+        hits += len(expected.intersection(found.tolist()))
+    return hits / (len(rows) * k), truth
+
+
+def tune_probes(index, target_recall, k=10, sample=500):
+    """Doubles index.probes until the sampled recall@k reaches target_recall; returns the recall."""
+    recall, truth = evaluate_recall(index, k=k, sample=sample)
+    while recall < target_recall and index.probes < min(MAX_PROBES, index.n_lists):
+        index.probes = min(index.probes * 2, index.n_lists)
+        recall, _ = evaluate_recall(index, k=k, sample=sample, truth=truth)
+    logger.info(f"IVF recall@{k} = {recall:.3f} probing {index.probes} of {index.n_lists} lists")
+    return recall
+
+
+def main():
+    from src.artifacts import load_artifacts
+
+    parser = argparse.ArgumentParser(description="Report recall@K of the IVF index against exact search")
+    parser.add_argument('directory', help="Artifact directory built with --ann")
+    parser.add_argument('--k', type=int, default=10, help="Neighbors compared per query")
+    parser.add_argument('--sample', type=int, default=500, help="Rows sampled as queries")
+    parser.add_argument('--probes', type=int, default=None, help="Override the probes stored in the manifest")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    index = IVFIndex.from_artifacts(load_artifacts(args.directory), probes=args.probes)
+    _, truth = evaluate_recall(index, k=args.k, sample=args.sample)
+    start = time.perf_counter()
+    recall, _ = evaluate_recall(index, k=args.k, sample=args.sample, truth=truth)
+    elapsed = time.perf_counter() - start
+    print(f"recall@{args.k} = {recall:.3f} (probing {index.probes} of {index.n_lists} lists, "
+          f"{elapsed / args.sample * 1000:.2f} ms per query)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Versioned, memory-mapped serving artifacts for the recommender"""
+
+import os
+import json
+import hashlib
+import logging
+import argparse
+import pickle
+import shutil
+import tempfile
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", "data/artifacts")
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+# Names the version subdirectory being served; replaced atomically after each build
+CURRENT_FILE = 'CURRENT'
+# Versions kept next to the current one, for servers still mapping them and for rollback
+KEEP_VERSIONS = 2
+CATALOG_FILE = 'movies.csv'
+LIST_SEPARATOR = '|'
+# Catalog columns holding lists, stored as LIST_SEPARATOR-joined strings
+LIST_COLUMNS = ('genres',)
+
+
+class ArtifactError(Exception):
+    """Raised when an artifact directory is missing, incomplete or corrupt."""
+
+
+def _sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sparse_arrays(name, matrix):
+    """Splits a CSR matrix into plain arrays that write_artifacts can store and memory-map."""
+    matrix = matrix.tocsr()
+    return {
+        f"{name}_data": matrix.data,
+        f"{name}_indices": matrix.indices,
+        f"{name}_indptr": matrix.indptr,
+        f"{name}_shape": np.array(matrix.shape, dtype=np.int64),
+    }
+
+
+class Artifacts:
+    """
+    It holds an opened artifact directory: the movie catalog plus named,
+    read-only memory-mapped arrays described by the manifest.
+    """
+
+    def __init__(self, directory, manifest, movies, arrays):
+        self.directory = directory
+        self.manifest = manifest
+        self.movies = movies
+        self.arrays = arrays
+
+    @property
+    def version(self):
+        return self.manifest['version']
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def __getitem__(self, name):
+        try:
+            return self.arrays[name]
+        except KeyError:
+            raise ArtifactError(f"Artifact '{name}' not found in {self.directory}") from None
+
+    def get(self, name, default=None):
+        return self.arrays.get(name, default)
+
+    def sparse(self, name):
+        """Reassembles a CSR matrix stored with sparse_arrays, without copying the mapped arrays."""
+        from scipy.sparse import csr_matrix
+
+        if f"{name}_data" not in self.arrays:
+            return None
+        return csr_matrix(
+            (self[f"{name}_data"], self[f"{name}_indices"], self[f"{name}_indptr"]),
+            shape=tuple(self[f"{name}_shape"]), copy=False
+        )
+
+
+def current_directory(directory):
+    """
+    The directory actually holding the artifacts: the version named by the CURRENT pointer,
+    or directory itself for the flat layout written before versions existed.
+    """
+    pointer = os.path.join(directory, CURRENT_FILE)
+    if not os.path.exists(pointer):
+        return directory
+    with open(pointer) as f:
+        return os.path.join(directory, f.read().strip())
+
+
+def _switch_version(directory, version):
+    """Points CURRENT at a version subdirectory with an atomic rename, then prunes old versions."""
+    pointer = os.path.join(directory, CURRENT_FILE)
+    staged = pointer + '.tmp'
+    with open(staged, 'w') as f:
+        f.write(version + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(staged, pointer)
+
+    # Unlinking is safe for servers that mapped an old version: their files live on until unmapped
+    versions = [entry for entry in os.scandir(directory)
+                if entry.is_dir() and entry.name != version and os.path.exists(os.path.join(entry.path, MANIFEST_FILE))]
+    versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in versions[KEEP_VERSIONS:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def write_artifacts(directory, movies, arrays, metadata=None):
+    """
+    Writes the catalog and arrays into a new version subdirectory of directory, then
+    switches the CURRENT pointer to it. Files of a published version are never rewritten,
+    since running servers may have them memory-mapped, and a partial build never loads.
+    """
+    os.makedirs(directory, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.build-', dir=directory)
+    try:
+        manifest = _write_version(staging, movies, arrays, metadata)
+        target = os.path.join(directory, manifest['version'])
+        if os.path.exists(target):
+            # Same content as an existing version: keep the files servers may be mapping
+            shutil.rmtree(staging)
+        else:
+            os.rename(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    _switch_version(directory, manifest['version'])
+    logger.info(f"Wrote artifacts version {manifest['version']} to {directory}")
+    return manifest
+
+
+def _write_version(directory, movies, arrays, metadata):
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    catalog = movies.reset_index(drop=True).copy()
+    for column in LIST_COLUMNS:
+        if column in catalog.columns:
+            catalog[column] = catalog[column].map(LIST_SEPARATOR.join)
+    catalog_path = os.path.join(directory, CATALOG_FILE)
+    catalog.to_csv(catalog_path, index=False)
+
+    entries = {}
+    for name, array in sorted(arrays.items()):
+        array = np.ascontiguousarray(array)
+        file_name = f"{name}.npy"
+        path = os.path.join(directory, file_name)
+        np.save(path, array, allow_pickle=False)
+        entries[name] = {
+            'file': file_name,
+            'shape': list(array.shape),
+            'dtype': array.dtype.str,
+            'sha256': _sha256(path),
+        }
+
+    catalog_entry = {'file': CATALOG_FILE, 'rows': len(catalog), 'sha256': _sha256(catalog_path)}
+    content_digest = hashlib.sha256(catalog_entry['sha256'].encode())
+    for name in sorted(entries):
+        content_digest.update(f"{name}:{entries[name]['sha256']}".encode())
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'version': content_digest.hexdigest()[:16],
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'catalog': catalog_entry,
+        'arrays': entries,
+        'metadata': metadata or {},
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def _load_catalog(directory, entry):
+    movies = pd.read_csv(os.path.join(directory, entry['file']), keep_default_na=False, dtype={'title': str})
+    for column in LIST_COLUMNS:
+        if column in movies.columns:
+            movies[column] = [value.split(LIST_SEPARATOR) if value else [] for value in movies[column]]
+    return movies
+
+
+def load_artifacts(directory, verify=False):
+    """
+    Opens an artifact directory. Arrays are memory-mapped read-only, so their pages
+    are loaded lazily and shared through the OS page cache between processes.
+    Checksums are only recomputed when verify is True, since that reads every byte.
+    """
+    directory = current_directory(directory)
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ArtifactError(f"No artifact manifest found at {manifest_path}")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported artifact format {manifest.get('format_version')} in {directory}")
+
+    if verify:
+        files = [manifest['catalog']] + list(manifest['arrays'].values())
+        for entry in files:
+            if _sha256(os.path.join(directory, entry['file'])) != entry['sha256']:
+                raise ArtifactError(f"Checksum mismatch for {entry['file']} in {directory}")
+
+    arrays = {}
+    for name, entry in manifest['arrays'].items():
+        array = np.load(os.path.join(directory, entry['file']), mmap_mode='r', allow_pickle=False)
+        if list(array.shape) != entry['shape'] or array.dtype.str != entry['dtype']:
+            raise ArtifactError(f"Artifact '{name}' does not match its manifest entry")
+        arrays[name] = array
+
+    movies = _load_catalog(directory, manifest['catalog'])
+    if len(movies) != manifest['catalog']['rows']:
+        raise ArtifactError(f"Catalog in {directory} does not match its manifest entry")
+
+    return Artifacts(directory, manifest, movies, arrays)
+
+
+def convert_pickles(movie_list_path, similarity_path, directory, k=None, keep_similarity=False):
+    """Converts the legacy movie_list.pkl/similarity.pkl pair into an artifact directory."""
+    from src.neighbors import NeighborIndex, DEFAULT_K
+
+    with open(movie_list_path, 'rb') as f:
+        movies = pickle.load(f)
+    with open(similarity_path, 'rb') as f:
+        similarity = pickle.load(f)
+
+    index = NeighborIndex.from_similarity(similarity, k=k or DEFAULT_K)
+    arrays = {'neighbor_ids': index.ids, 'neighbor_scores': index.scores}
+    if keep_similarity:
+        arrays['similarity'] = similarity.astype(np.float32)
+
+    catalog = movies[['movie_id', 'title', 'genres']]
+    return write_artifacts(directory, catalog, arrays, metadata={'source': 'pickle'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage recommender serving artifacts")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser('convert', help="Convert legacy pickles into an artifact directory")
+    convert.add_argument('movie_list', help="Path to movie_list.pkl")
+    convert.add_argument('similarity', help="Path to similarity.pkl")
+    convert.add_argument('output', help="Artifact directory to write")
+    convert.add_argument('--k', type=int, default=None, help="Neighbors kept per movie")
+    convert.add_argument('--keep-similarity', action='store_true',
+                         help="Also store the dense matrix (float32) for requests beyond K")
+
+    verify = subparsers.add_parser('verify', help="Check an artifact directory against its manifest")
+    verify.add_argument('directory', help="Artifact directory to check")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'convert':
+        convert_pickles(args.movie_list, args.similarity, args.output,
+                        k=args.k, keep_similarity=args.keep_similarity)
+    elif args.command == 'verify':
+        artifacts = load_artifacts(args.directory, verify=True)
+        print(f"✅ Artifacts version {artifacts.version} OK ({len(artifacts.movies)} movies)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Offline build of the recommender serving artifacts from the TMDB 5000 CSVs.
+
+Usage:
+    python -m src.build_index tmdb_5000_movies.csv tmdb_5000_credits.csv --output data/artifacts
+"""
+
+import json
+import time
+import logging
+import argparse
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+from src.artifacts import write_artifacts, sparse_arrays
+from src.ann import IVFIndex, tune_probes
+from src.embeddings import DEFAULT_DIM, EmbeddingIndex, build_embeddings, overlap_at_k
+from src.neighbors import NeighborIndex
+from src.neighbors import DEFAULT_K
+from src.similarity import DEFAULT_BLOCK_SIZE, build_neighbors, normalize_rows
+
+logger = logging.getLogger(__name__)
+
+MAX_FEATURES = 5000
+CAST_LIMIT = 3
+# Kept in the catalog to rank "top" lists (see MovieCatalog.popularity_scores)
+SCORE_COLUMNS = ('popularity', 'vote_average', 'vote_count')
+
+
+@contextmanager
+def _stage(name):
+    """Logs how long a build stage took."""
+    start = time.perf_counter()
+    yield
+    logger.info(f"{name}: {time.perf_counter() - start:.2f}s")
+
+
+def parse_json_column(column):
+    """
+    Parses a column of JSON documents with one json.loads call,
+    instead of one ast.literal_eval per row.
+    """
+    return json.loads('[' + ','.join(column.tolist()) + ']')
+
+
+def _names(documents, limit=None):
+    return [[item['name'].replace(" ", "") for item in doc[:limit]] for doc in documents]
+
+
+def _directors(documents):
+    return [[item['name'].replace(" ", "") for item in doc if item['job'] == 'Director'] for doc in documents]
+
+
+def load_movies(movies_csv, credits_csv):
+    """Reads the TMDB CSVs and returns one row per movie with list-valued metadata."""
+    movies = pd.read_csv(movies_csv, usecols=['id', 'title', 'overview', 'genres', 'keywords', 'release_date',
+                                              *SCORE_COLUMNS])
+    credits = pd.read_csv(credits_csv, usecols=['movie_id', 'cast', 'crew'])
+    movies = movies.rename(columns={'id': 'movie_id'}).merge(credits, on='movie_id')
+    movies = movies.dropna(subset=['title', 'overview', 'genres', 'keywords', 'cast', 'crew'])
+    movies = movies.sort_values('movie_id', kind='stable').reset_index(drop=True)
+    movies[list(SCORE_COLUMNS)] = movies[list(SCORE_COLUMNS)].fillna(0)
+    # Release year for the year filters of src.filtered, 0 when the date is missing
+    release_dates = pd.to_datetime(movies.pop('release_date'), format='%Y-%m-%d', errors='coerce')
+    movies['year'] = release_dates.dt.year.fillna(0).astype(np.int16)
+
+    movies['genres'] = _names(parse_json_column(movies['genres']))
+    movies['keywords'] = _names(parse_json_column(movies['keywords']))
+    movies['cast'] = _names(parse_json_column(movies['cast']), limit=CAST_LIMIT)
+    movies['crew'] = _directors(parse_json_column(movies['crew']))
+    return movies
+
+
+def build_tags(movies):
+    """Joins overview words, genres, keywords, top cast and directors into one tag string per movie."""
+    columns = zip(movies['overview'], movies['genres'], movies['keywords'], movies['cast'], movies['crew'])
+    return [" ".join([overview, *genres, *keywords, *cast, *crew])
+            for overview, genres, keywords, cast, crew in columns]
+
+
+def vectorize_tags(tags, max_features=MAX_FEATURES):
+    """Returns the sparse bag-of-words count matrix of the tags."""
+    vectorizer = CountVectorizer(max_features=max_features, stop_words='english', dtype=np.float32)
+    return vectorizer.fit_transform(tags).tocsr()
+
+
+def build(movies_csv, credits_csv, output, k=DEFAULT_K, max_features=MAX_FEATURES,
+          block_size=DEFAULT_BLOCK_SIZE, workers=None, exact=True, ann=False,
+          ann_lists=None, target_recall=0.8, embedding_dim=DEFAULT_DIM, embedding_dtype='float32'):
+    with _stage("Loading and parsing CSVs"):
+        movies = load_movies(movies_csv, credits_csv)
+    logger.info(f"Loaded {len(movies)} movies")
+
+    with _stage("Building tags"):
+        tags = build_tags(movies)
+
+    with _stage("Vectorizing tags"):
+        vectors = vectorize_tags(tags, max_features=max_features)
+
+    arrays = {}
+    metadata = {'source': 'tmdb_csv', 'max_features': max_features}
+    if exact:
+        with _stage("Computing neighbors"):
+            arrays['neighbor_ids'], arrays['neighbor_scores'] = build_neighbors(
+                vectors, k=k, block_size=block_size, workers=workers)
+        metadata['k'] = int(arrays['neighbor_ids'].shape[1])
+
+    if ann:
+        with _stage("Building IVF index"):
+            index = IVFIndex.build(vectors, n_lists=ann_lists)
+        with _stage("Tuning IVF probes"):
+            recall = tune_probes(index, target_recall)
+        arrays.update(sparse_arrays('tags', index.vectors))
+        arrays.update(index.to_arrays())
+        metadata['ann'] = {'lists': index.n_lists, 'probes': index.probes, 'recall@10': round(recall, 4)}
+    else:
+        # Filtered queries score the whole catalog by exact cosine on these
+        arrays.update(sparse_arrays('tags', normalize_rows(vectors)))
+
+    if embedding_dim:
+        with _stage("Computing embeddings"):
+            arrays['embeddings'] = build_embeddings(vectors, dim=embedding_dim, dtype=np.dtype(embedding_dtype))
+        metadata['embeddings'] = {'dim': int(arrays['embeddings'].shape[1]), 'dtype': embedding_dtype}
+        if exact:
+            overlap = overlap_at_k(EmbeddingIndex(arrays['embeddings']),
+                                   NeighborIndex(arrays['neighbor_ids'], arrays['neighbor_scores']), k=5)
+            logger.info(f"Embedding overlap@5 with the exact lists: {overlap:.3f}")
+            metadata['embeddings']['overlap@5'] = round(overlap, 4)
+
+    with _stage("Writing artifacts"):
+        manifest = write_artifacts(
+            output,
+            movies[['movie_id', 'title', 'genres', 'year', *SCORE_COLUMNS]],
+            arrays,
+            metadata=metadata,
+        )
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build recommender artifacts from the TMDB CSVs")
+    parser.add_argument('movies_csv', help="Path to tmdb_5000_movies.csv")
+    parser.add_argument('credits_csv', help="Path to tmdb_5000_credits.csv")
+    parser.add_argument('--output', default='data/artifacts', help="Artifact directory to write")
+    parser.add_argument('--k', type=int, default=DEFAULT_K, help="Neighbors kept per movie")
+    parser.add_argument('--max-features', type=int, default=MAX_FEATURES, help="Vocabulary size of the tag vectors")
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE, help="Rows multiplied per similarity block")
+    parser.add_argument('--workers', type=int, default=None, help="Similarity worker processes (default: all cores)")
+    parser.add_argument('--ann', action='store_true', help="Also build the IVF index for approximate search")
+    parser.add_argument('--no-exact', action='store_true', help="Skip the exact top-K neighbors (needs --ann)")
+    parser.add_argument('--ann-lists', type=int, default=None, help="IVF lists (default: sqrt(N))")
+    parser.add_argument('--target-recall', type=float, default=0.8,
+                        help="Recall@10 against exact search the IVF probes are tuned for")
+    parser.add_argument('--embedding-dim', type=int, default=DEFAULT_DIM,
+                        help="Dimensions of the low-rank embeddings (0 to skip them)")
+    parser.add_argument('--embedding-dtype', choices=['float16', 'float32'], default='float32',
+                        help="Storage type of the embeddings")
+    args = parser.parse_args()
+
+    if args.no_exact and not args.ann:
+        parser.error("--no-exact requires --ann")
+
+    logging.basicConfig(level=logging.INFO)
+    with _stage("Total build"):
+        build(args.movies_csv, args.credits_csv, args.output,
+              k=args.k, max_features=args.max_features,
+              block_size=args.block_size, workers=args.workers,
+              exact=not args.no_exact, ann=args.ann, ann_lists=args.ann_lists,
+              target_recall=args.target_recall, embedding_dim=args.embedding_dim,
+              embedding_dtype=args.embedding_dtype)
+
+
+if __name__ == "__main__":
+    main()
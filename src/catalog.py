@@ -0,0 +1,146 @@
+"""In-memory movie catalog with O(1) title, movie_id and genre lookups"""
+
+import numpy as np
+
+# Vote count percentile a movie needs before its own average outweighs the global mean
+VOTE_COUNT_QUANTILE = 0.8
+
+
+class MovieCatalog:
+    """
+    It wraps the movies DataFrame with dict/array indexes, so lookups by title
+    or movie_id do not scan the whole frame. Rows are positional (0..N-1) and
+    line up with the rows of the serving artifacts.
+    """
+
+    def __init__(self, movies):
+        self.movies = movies.reset_index(drop=True)
+        self.titles = self.movies['title'].to_numpy()
+        # row -> movie_id
+        self.movie_ids = self.movies['movie_id'].to_numpy(dtype=np.int64)
+
+        self._row_by_movie_id = {movie_id: row for row, movie_id in enumerate(self.movie_ids.tolist())}
+        self._id_order = np.argsort(self.movie_ids, kind='stable')
+        self._sorted_ids = self.movie_ids[self._id_order]
+        # The first row wins for duplicate titles, matching the previous mask[0] lookups
+        self._row_by_title = {}
+        for row, title in enumerate(self.titles.tolist()):
+            self._row_by_title.setdefault(title, row)
+
+        self.popularity = self.popularity_scores()
+        # All rows, most popular first
+        self.ranked_rows = np.lexsort((np.arange(len(self.movie_ids)), -self.popularity)).astype(np.int32)
+        self._build_genre_index()
+        # Release year per row (0 when unknown); None for catalogs built without release dates
+        self.years = self.movies['year'].to_numpy(dtype=np.int16) if 'year' in self.movies else None
+
+    def popularity_scores(self):
+        """
+        Ranks movies with the IMDB weighted rating, v/(v+m)·R + m/(v+m)·C, using the vote
+        columns from the source CSVs. Catalogs without them keep their file order.
+        """
+        n = len(self.movies)
+        if not {'vote_average', 'vote_count'}.issubset(self.movies.columns):
+            return np.linspace(1.0, 0.0, n, dtype=np.float32) if n else np.zeros(0, dtype=np.float32)
+
+        votes = self.movies['vote_count'].to_numpy(dtype=np.float64)
+        average = self.movies['vote_average'].to_numpy(dtype=np.float64)
+        m = max(np.quantile(votes, VOTE_COUNT_QUANTILE), 1.0)
+        c = np.average(average, weights=votes) if votes.sum() else average.mean()
+        return ((votes * average + m * c) / (votes + m)).astype(np.float32)
+
+    def _build_genre_index(self):
+        """Builds genre -> rows (ranked by popularity) postings and a per-movie genre bitmask."""
+        self.genres = sorted({genre for genres in self.movies['genres'] for genre in genres})
+        if len(self.genres) > 64:
+            raise ValueError(f"Genre bitmask supports at most 64 genres, got {len(self.genres)}")
+        self._genre_bits = {genre: np.uint64(1) << np.uint64(bit) for bit, genre in enumerate(self.genres)}
+
+        self.genre_masks = np.zeros(len(self.movies), dtype=np.uint64)
+        for row, genres in enumerate(self.movies['genres']):
+            for genre in genres:
+                self.genre_masks[row] |= self._genre_bits[genre]
+
+        self._rows_by_genre = {}
+        ranked_masks = self.genre_masks[self.ranked_rows]
+        for genre, bit in self._genre_bits.items():
+            self._rows_by_genre[genre] = self.ranked_rows[(ranked_masks & bit) != 0]
+
+    def genre_mask(self, genres):
+        """Returns the bitmask of a list of genres, or None if any genre is unknown."""
+        mask = np.uint64(0)
+        for genre in genres:
+            if genre not in self._genre_bits:
+                return None
+            mask |= self._genre_bits[genre]
+        return mask
+
+    def top_in_genres(self, genres, limit=10, offset=0):
+        """
+        Returns the most popular rows having all the given genres.
+        One genre is a slice of its pre-ranked list; several genres filter the
+        shortest list with a bitwise AND against the movie bitmasks.
+        """
+        mask = self.genre_mask(genres)
+        if mask is None:
+            return np.empty(0, dtype=np.int32)
+        if not genres:
+            return self.ranked_rows[offset:offset + limit]
+
+        shortest = min((self._rows_by_genre[genre] for genre in genres), key=len)
+        if len(genres) > 1:
+            shortest = shortest[(self.genre_masks[shortest] & mask) == mask]
+        return shortest[offset:offset + limit]
+
+    def filter_mask(self, genres=None, min_year=None, max_year=None):
+        """
+        Boolean mask of the rows having all the given genres and released within
+        [min_year, max_year]. Unknown genres match nothing; a year bound excludes
+        movies without a known year, and is ignored if the catalog has no years.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if genres:
+            bits = self.genre_mask(genres)
+            if bits is None:
+                return np.zeros(len(self), dtype=bool)
+            mask &= (self.genre_masks & bits) == bits
+        if self.years is not None and (min_year is not None or max_year is not None):
+            mask &= self.years > 0
+            if min_year is not None:
+                mask &= self.years >= min_year
+            if max_year is not None:
+                mask &= self.years <= max_year
+        return mask
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    def row_for_title(self, title):
+        return self._row_by_title.get(title)
+
+    def row_for_movie_id(self, movie_id):
+        return self._row_by_movie_id.get(int(movie_id))
+
+    def movie_id(self, row):
+        return int(self.movie_ids[row])
+
+    def title(self, row):
+        return self.titles[row]
+
+    def title_for_movie_id(self, movie_id):
+        row = self.row_for_movie_id(movie_id)
+        return None if row is None else self.titles[row]
+
+    def rows_for_movie_ids(self, movie_ids):
+        """Maps movie ids to catalog rows, dropping ids that are not in the catalog."""
+        rows = (self._row_by_movie_id.get(int(movie_id)) for movie_id in movie_ids)
+        return np.fromiter((row for row in rows if row is not None), dtype=np.int64)
+
+    def rows_for_movie_id_array(self, movie_ids):
+        """Vectorized movie_id -> row mapping for large arrays; unknown ids map to -1."""
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        if len(self) == 0:
+            return np.full(movie_ids.shape, -1, dtype=np.int64)
+        positions = np.clip(np.searchsorted(self._sorted_ids, movie_ids), 0, len(self) - 1)
+        found = self._sorted_ids[positions] == movie_ids
+        return np.where(found, self._id_order[positions], -1)
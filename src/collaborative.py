@@ -0,0 +1,149 @@
+"""
+Item-item collaborative filtering trained from the ratings table.
+
+Usage:
+    python -m src.collaborative --output data/cf
+"""
+
+import os
+import time
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from sqlalchemy import select
+from src.artifacts import ARTIFACT_DIR, write_artifacts, load_artifacts, ArtifactError
+from src.catalog import MovieCatalog
+from src.neighbors import NeighborIndex, DEFAULT_K
+from src.similarity import DEFAULT_BLOCK_SIZE, build_neighbors
+from src.Database.database import get_db_session
+from src.Database.models import Rating
+
+logger = logging.getLogger(__name__)
+
+CF_DIR = os.getenv("CF_DIR", "data/cf")
+CHUNK_SIZE = 100_000
+
+
+class CollaborativeModel(NeighborIndex):
+    """Item-item neighbor lists plus the number of ratings each item received."""
+
+    def __init__(self, ids, scores, rating_counts=None):
+        super().__init__(ids, scores)
+        self.rating_counts = rating_counts
+
+
+def stream_ratings(catalog, chunk_size=CHUNK_SIZE):
+    """
+    Streams the ratings table in chunks and yields (user_ids, rows, ratings) arrays,
+    with movie ids already mapped to catalog rows and unknown movies dropped.
+    """
+    statement = select(Rating.user_id, Rating.movie_id, Rating.rating).execution_options(yield_per=chunk_size)
+    with get_db_session() as session:
+        for partition in session.execute(statement).partitions():
+            user_ids, movie_ids, ratings = zip(*partition)
+            rows = catalog.rows_for_movie_id_array(movie_ids)
+            known = rows >= 0
+            yield (np.asarray(user_ids, dtype=object)[known], rows[known],
+                   np.asarray(ratings, dtype=np.float32)[known])
+
+
+def build_rating_matrix(catalog, chunk_size=CHUNK_SIZE):
+    """Returns the sparse user × item CSR rating matrix and the user_id -> matrix row mapping."""
+    user_codes = {}
+    codes, rows, ratings = [], [], []
+    for chunk_users, chunk_rows, chunk_ratings in stream_ratings(catalog, chunk_size):
+        # Factorize inside the chunk, then map only its distinct users to global codes
+        local_codes, uniques = pd.factorize(chunk_users)
+        lookup = np.fromiter((user_codes.setdefault(user, len(user_codes)) for user in uniques),
+                             dtype=np.int32, count=len(uniques))
+        codes.append(lookup[local_codes])
+        rows.append(chunk_rows.astype(np.int32))
+        ratings.append(chunk_ratings)
+
+    if not codes:
+        return csr_matrix((0, len(catalog)), dtype=np.float32), user_codes
+    matrix = csr_matrix(
+        (np.concatenate(ratings), (np.concatenate(codes), np.concatenate(rows))),
+        shape=(len(user_codes), len(catalog)), dtype=np.float32
+    )
+    matrix.sum_duplicates()
+    return matrix, user_codes
+
+
+def center_rows(matrix):
+    """Subtracts each user's mean rating from their stored ratings."""
+    counts = np.diff(matrix.indptr)
+    means = np.asarray(matrix.sum(axis=1)).ravel() / np.maximum(counts, 1)
+    centered = matrix.copy()
+    centered.data -= np.repeat(means, counts).astype(np.float32)
+    return centered
+
+
+def train(catalog, k=DEFAULT_K, chunk_size=CHUNK_SIZE, block_size=DEFAULT_BLOCK_SIZE, workers=None):
+    """
+    Builds an item-item neighbor index over catalog rows from mean-centered ratings (adjusted cosine).
+    Only positively correlated neighbors are kept; unused slots hold id -1 and score 0.
+    """
+    matrix, user_codes = build_rating_matrix(catalog, chunk_size)
+    logger.info(f"Loaded {matrix.nnz} ratings from {len(user_codes)} users")
+
+    items = center_rows(matrix).T.tocsr()
+    rated = np.flatnonzero(np.diff(items.indptr) > 0)
+    ids = np.full((len(catalog), k), -1, dtype=np.int32)
+    scores = np.zeros((len(catalog), k), dtype=np.float32)
+    if len(rated) > 1:
+        rated_ids, rated_scores = build_neighbors(items[rated], k=k, block_size=block_size, workers=workers)
+        positive = rated_scores > 0
+        width = rated_ids.shape[1]
+        ids[rated, :width] = np.where(positive, rated[rated_ids], -1)
+        scores[rated, :width] = np.where(positive, rated_scores, 0)
+    rating_counts = np.diff(matrix.tocsc().indptr).astype(np.int32)
+    return CollaborativeModel(ids, scores, rating_counts), matrix
+
+
+def save_model(directory, catalog, model, metadata=None):
+    return write_artifacts(
+        directory,
+        catalog.movies[['movie_id']],
+        {'cf_ids': model.ids, 'cf_scores': model.scores, 'cf_counts': model.rating_counts},
+        metadata={'kind': 'collaborative', **(metadata or {})},
+    )
+
+
+def load_model(directory, catalog):
+    """
+    Opens a trained model, or returns None if there is none or it was trained
+    against a different catalog (its rows would not line up).
+    """
+    try:
+        artifacts = load_artifacts(directory)
+    except ArtifactError as e:
+        logger.info(f"No collaborative model loaded: {e}")
+        return None
+    if not np.array_equal(artifacts.movies['movie_id'].to_numpy(dtype=np.int64), catalog.movie_ids):
+        logger.warning(f"Collaborative model in {directory} was trained on another catalog, ignoring it")
+        return None
+    return CollaborativeModel(artifacts['cf_ids'], artifacts['cf_scores'], artifacts.get('cf_counts'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the item-item collaborative filtering model")
+    parser.add_argument('--artifacts', default=ARTIFACT_DIR, help="Content artifact directory (for the catalog)")
+    parser.add_argument('--output', default=CF_DIR, help="Directory to write the model to")
+    parser.add_argument('--k', type=int, default=DEFAULT_K, help="Neighbors kept per movie")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Ratings fetched per round trip")
+    parser.add_argument('--workers', type=int, default=None, help="Similarity worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    catalog = MovieCatalog(load_artifacts(args.artifacts).movies)
+    model, matrix = train(catalog, k=args.k, chunk_size=args.chunk_size, workers=args.workers)
+    save_model(args.output, catalog, model, metadata={'ratings': int(matrix.nnz), 'users': int(matrix.shape[0])})
+    logger.info(f"Trained collaborative model in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
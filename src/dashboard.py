@@ -0,0 +1,73 @@
+"""Paginated loaders for the user dashboard"""
+
+import logging
+from sqlalchemy import select, and_, or_
+from src.tmdb_utils import fetch_many
+from src.Database.database import get_db_session
+from src.Database.models import Rating, WatchlistItem
+
+logger = logging.getLogger(__name__)
+
+WATCHLIST_PAGE_SIZE = 20
+RATINGS_PAGE_SIZE = 10
+
+
+def _keyset_page(columns, model, timestamp, user_id, cursor, page_size):
+    """
+    Returns (rows, next_cursor) for one page of a user's items, newest first.
+    The cursor is the (timestamp, id) of the last row of the previous page, so every
+    page is a range scan of the (user_id, timestamp) index no matter how deep it is.
+    """
+    statement = select(*columns).where(model.user_id == user_id)
+    if cursor is not None:
+        last_timestamp, last_id = cursor
+        statement = statement.where(or_(
+            timestamp < last_timestamp,
+            and_(timestamp == last_timestamp, model.id < last_id)
+        ))
+    # One extra row tells whether there is a next page
+    statement = statement.order_by(timestamp.desc(), model.id.desc()).limit(page_size + 1)
+    with get_db_session() as session:
+        rows = session.execute(statement).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = (getattr(rows[-1], timestamp.key), rows[-1].id)
+    return rows, next_cursor
+
+
+def _with_movies(items, catalog):
+    """Adds titles (one vectorized id lookup) and the page's posters (one batched fetch) to the items."""
+    if not items:
+        return items
+    catalog_rows = catalog.rows_for_movie_id_array([item['movie_id'] for item in items])
+    metadata_by_id = fetch_many(item['movie_id'] for item in items)
+    for item, row in zip(items, catalog_rows):
+        if row >= 0:
+            item['title'] = catalog.title(row)
+        item['poster'] = metadata_by_id[item['movie_id']]['poster']
+    return items
+
+
+def load_watchlist_page(user_id, catalog, cursor=None, page_size=WATCHLIST_PAGE_SIZE):
+    """Returns (items, next_cursor); items are dicts with id, movie_id, title and poster."""
+    rows, next_cursor = _keyset_page(
+        (WatchlistItem.id, WatchlistItem.movie_id, WatchlistItem.movie_title, WatchlistItem.added_at),
+        WatchlistItem, WatchlistItem.added_at, user_id, cursor, page_size
+    )
+    items = [{'id': row.id, 'movie_id': row.movie_id, 'title': row.movie_title} for row in rows]
+    return _with_movies(items, catalog), next_cursor
+
+
+def load_ratings_page(user_id, catalog, cursor=None, page_size=RATINGS_PAGE_SIZE):
+    """
+    Returns (items, next_cursor); items are dicts with id, movie_id, rating, title and poster.
+    Ratings of movies that left the catalog have title None.
+    """
+    rows, next_cursor = _keyset_page(
+        (Rating.id, Rating.movie_id, Rating.rating, Rating.created_at),
+        Rating, Rating.created_at, user_id, cursor, page_size
+    )
+    items = [{'id': row.id, 'movie_id': row.movie_id, 'rating': row.rating, 'title': None} for row in rows]
+    return _with_movies(items, catalog), next_cursor
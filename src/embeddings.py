@@ -0,0 +1,126 @@
+"""
+Compact low-rank movie embeddings (TruncatedSVD of the tag vectors).
+
+Usage:
+    python -m src.embeddings data/artifacts --k 5
+"""
+
+import logging
+import argparse
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from src.neighbors import DEFAULT_K, top_k, top_k_rows
+from src.similarity import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIM = 128
+# Rows of float16 embeddings upcast at a time (BLAS has no float16 kernels)
+UPCAST_BLOCK_SIZE = 65536
+
+
+def build_embeddings(vectors, dim=DEFAULT_DIM, dtype=np.float32, seed=0):
+    """Projects the normalized tag vectors to dim dimensions and L2-normalizes the result."""
+    vectors = normalize_rows(vectors)
+    dim = min(dim, vectors.shape[1] - 1, vectors.shape[0] - 1)
+    reduced = TruncatedSVD(n_components=dim, random_state=seed).fit_transform(vectors)
+    norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+    return (reduced / np.maximum(norms, 1e-12)).astype(dtype)
+
+
+class EmbeddingIndex:
+    """
+    It answers similarity queries with one matrix-vector product over the (N, dim) embeddings
+    plus an argpartition, so nothing N×N is ever stored. Several seeds are combined into a
+    single query vector first, so "more like these" is still one BLAS call.
+    """
+
+    def __init__(self, embeddings, k=DEFAULT_K, block_size=UPCAST_BLOCK_SIZE):
+        # Kept as stored (memory-mapped, shared between processes); float16 is upcast per block at query time
+        self.embeddings = embeddings
+        self.k = k
+        self.block_size = block_size
+
+    @classmethod
+    def from_artifacts(cls, artifacts):
+        return cls(artifacts['embeddings'])
+
+    def __len__(self):
+        return self.embeddings.shape[0]
+
+    def _products(self, queries):
+        """(len(queries), N) float32 dot products of float32 query vectors with every embedding."""
+        if self.embeddings.dtype == np.float32:
+            return queries @ self.embeddings.T
+        products = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), self.block_size):
+            block = self.embeddings[start:start + self.block_size].astype(np.float32)
+            products[:, start:start + len(block)] = queries @ block.T
+        return products
+
+    def scores(self, rows, weights=None):
+        """Cosine scores of every movie against the weighted sum of the seed rows' embeddings."""
+        seeds = self.embeddings[np.atleast_1d(rows)].astype(np.float32)
+        query = seeds.sum(axis=0) if weights is None else np.asarray(weights, dtype=np.float32) @ seeds
+        return self._products(query[None, :])[0]
+
+    def more_like_these(self, rows, k, weights=None):
+        """Returns (ids, scores) of the k movies closest to a set of seed rows, seeds excluded."""
+        scores = self.scores(rows, weights)
+        scores[np.atleast_1d(rows)] = -np.inf
+        top = top_k(scores, k)
+        return top.astype(np.int32), scores[top]
+
+    def neighbors(self, row, k):
+        """Same contract as NeighborIndex.neighbors."""
+        return self.more_like_these(row, k)
+
+    def neighbor_lists(self, rows, k=None, block_size=256):
+        """(len(rows), k) neighbor ids and scores, one matrix product per block of rows."""
+        k = min(k or self.k, len(self) - 1)
+        rows = np.atleast_1d(rows)
+        ids = np.empty((len(rows), k), dtype=np.int32)
+        scores = np.empty((len(rows), k), dtype=np.float32)
+        for start in range(0, len(rows), block_size):
+            block_rows = rows[start:start + block_size]
+            block = self._products(self.embeddings[block_rows].astype(np.float32))
+            block[np.arange(len(block_rows)), block_rows] = -np.inf
+            ids[start:start + len(block_rows)], scores[start:start + len(block_rows)] = top_k_rows(block, k)
+        return ids, scores
+
+
+def overlap_at_k(index, reference, k=5, sample=1000, seed=0):
+    """
+    Quality check: mean fraction of a reference index's top-k lists (e.g. the exact
+    neighbor lists) that the embeddings reproduce, over a random sample of rows.
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(index), size=min(sample, len(index)), replace=False)
+    hits = 0
+    for row in rows:
+        expected, _ = reference.neighbors(row, k)
+        found, _ = index.neighbors(row, k)
+        hits += len(set(expected.tolist()).intersection(found.tolist()))
+    return hits / (len(rows) * k)
+
+
+def main():
+    from src.artifacts import load_artifacts
+    from src.neighbors import NeighborIndex
+
+    parser = argparse.ArgumentParser(description="Compare embedding top-K lists with the exact neighbor lists")
+    parser.add_argument('directory', help="Artifact directory with embeddings and neighbor lists")
+    parser.add_argument('--k', type=int, default=5, help="List length compared")
+    parser.add_argument('--sample', type=int, default=1000, help="Rows sampled")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    artifacts = load_artifacts(args.directory)
+    index = EmbeddingIndex.from_artifacts(artifacts)
+    overlap = overlap_at_k(index, NeighborIndex.from_artifacts(artifacts), k=args.k, sample=args.sample)
+    print(f"overlap@{args.k} with the exact lists = {overlap:.3f} "
+          f"({index.embeddings.shape[1]}-d {artifacts.manifest['arrays']['embeddings']['dtype']} embeddings)")
+
+
+if __name__ == "__main__":
+    main()
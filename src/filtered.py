@@ -0,0 +1,142 @@
+"""
+Filtered top-K: leave out movies a user has seen, keep only some genres or release years,
+and still return exactly k results.
+
+Filtering the precomputed neighbor lists comes back short whenever the filters remove too
+many of them, and over-fetching with retries only moves the problem. Instead every catalog row
+is scored against the seeds, the ineligible rows are masked out and one argpartition picks the
+k best of the rest, so the worst case is the O(N) of an unfiltered full-catalog query.
+"""
+
+import logging
+import numpy as np
+from src.neighbors import top_k
+from src.embeddings import EmbeddingIndex
+from src.hybrid import DEFAULT_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+# Scale of the prior among rows without any content score, below every positive cosine
+TIE_BREAK = 1e-9
+
+
+def _weights(rows, weights):
+    if weights is None:
+        return np.ones(len(rows), dtype=np.float32)
+    return np.asarray(weights, dtype=np.float32)
+
+
+def scatter_scores(index, rows, weights, n):
+    """The seeds' weighted neighbor lists summed into a vector of n scores (0 outside the lists)."""
+    rows = np.atleast_1d(rows)
+    ids, scores = index.neighbor_lists(rows)
+    scores = _weights(rows, weights)[:, None] * scores
+    valid = ids >= 0
+    return np.bincount(ids[valid], weights=scores[valid], minlength=n).astype(np.float32)
+
+
+class SimilarityScorer:
+    """It reads full score rows from the dense N×N similarity matrix."""
+
+    def __init__(self, similarity):
+        self.similarity = similarity
+
+    def scores(self, rows, weights=None):
+        rows = np.atleast_1d(rows)
+        return _weights(rows, weights) @ np.asarray(self.similarity[rows], dtype=np.float32)
+
+
+class TagScorer:
+    """It scores every movie by cosine against the seeds' L2-normalized sparse tag vectors."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def scores(self, rows, weights=None):
+        rows = np.atleast_1d(rows)
+        query = self.vectors[rows].T @ _weights(rows, weights)
+        return np.asarray(self.vectors @ query, dtype=np.float32).ravel()
+
+
+class NeighborListScorer:
+    """
+    Fallback when no tag vectors are stored: the seeds' neighbor lists scattered into a vector
+    of N scores. Movies outside every list score 0, so past the lists the prior decides.
+    """
+
+    def __init__(self, index, n):
+        self.index = index
+        self.n = n
+
+    def scores(self, rows, weights=None):
+        return scatter_scores(self.index, rows, weights, self.n)
+
+
+def full_scorer(artifacts, content):
+    """
+    Picks the full-catalog scorer for an artifact directory: the dense similarity matrix or
+    the tag vectors (exact cosine), else the content index's lists. An embedding backend is
+    used as is, so filtered and unfiltered results agree; otherwise the approximate
+    embeddings are never preferred over the exact lists.
+    """
+    if isinstance(content, EmbeddingIndex):
+        return content
+    if 'similarity' in artifacts:
+        return SimilarityScorer(artifacts['similarity'])
+    tags = artifacts.sparse('tags')
+    if tags is not None:
+        return TagScorer(tags)
+    logger.warning("No tag vectors in the artifacts (rebuild with src.build_index); "
+                   "filtered queries rank beyond the neighbor lists by the prior")
+    return NeighborListScorer(content, len(artifacts.movies))
+
+
+class FilteredRanker:
+    """
+    It scores the whole catalog with the same weighted sources as HybridRanker (content,
+    collaborative neighbors, popularity prior) and takes the top k of the rows a mask allows.
+    """
+
+    def __init__(self, scorer, collaborative=None, prior=None, weights=None):
+        self.scorer = scorer
+        self.collaborative = collaborative
+        self.prior = prior
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+
+    def scores(self, rows, weights=None):
+        """Scores of every catalog row for the seed rows."""
+        scores = self.weights['content'] * self.scorer.scores(rows, weights)
+        if self.collaborative is not None and self.weights['collaborative']:
+            scores += self.weights['collaborative'] * scatter_scores(self.collaborative, rows, weights, len(scores))
+        if self.prior is not None:
+            scores += self.weights['popularity'] * self.prior
+        return scores
+
+    def rank(self, rows, weights, k, mask):
+        """
+        Returns (rows, scores) of the k best rows allowed by the boolean mask, best first.
+        Seeds are never returned; fewer than k come back only if fewer rows are eligible.
+        """
+        rows = np.atleast_1d(np.asarray(rows, dtype=np.int64))
+        mask = mask.copy()
+        mask[rows] = False
+        candidates = np.flatnonzero(mask)
+        scores = self.scores(rows, weights)[candidates]
+        top = top_k(scores, k)
+        return candidates[top], scores[top]
+
+    def similar(self, row, k, mask):
+        """
+        Content-only top k for one title among the rows the mask allows, ranked like
+        recommend(): one masked score vector over the catalog and one top_k, no retries.
+        Rows without any content score (past the neighbor lists) are ordered by the prior.
+        """
+        mask = mask.copy()
+        mask[row] = False
+        candidates = np.flatnonzero(mask)
+        scores = self.scorer.scores([row])[candidates]
+        if self.prior is not None:
+            unscored = scores == 0
+            scores[unscored] = TIE_BREAK * self.prior[candidates[unscored]]
+        top = top_k(scores, k)
+        return candidates[top], scores[top]
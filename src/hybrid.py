@@ -0,0 +1,96 @@
+"""Hybrid ranking over content neighbors, collaborative neighbors and a popularity prior"""
+
+import time
+import logging
+import numpy as np
+from src.neighbors import top_k
+
+logger = logging.getLogger(__name__)
+
+# Used for multi-seed (personalized) lists; single-title "similar movies" stay content-exact
+DEFAULT_WEIGHTS = {'content': 1.0, 'collaborative': 0.5, 'popularity': 0.1}
+DEFAULT_BUDGET_MS = 50.0
+POPULAR_POOL_SIZE = 200
+
+
+def popularity_prior(catalog, rating_counts=None):
+    """
+    Returns a 0..1 prior per catalog row from the catalog's weighted vote score,
+    averaged with log-scaled in-app rating counts when they are available.
+    """
+    scores = catalog.popularity.astype(np.float32)
+    spread = scores.max() - scores.min() if len(scores) else 0.0
+    prior = (scores - scores.min()) / spread if spread > 0 else np.zeros_like(scores)
+    if rating_counts is not None and rating_counts.max() > 0:
+        counts = np.log1p(rating_counts.astype(np.float32))
+        prior = 0.5 * prior + 0.5 * counts / counts.max()
+    return prior
+
+
+class HybridRanker:
+    """
+    It gathers candidates from the seeds' content neighbors, their collaborative neighbors
+    and (when those run short) the most popular movies, merges them in NumPy arrays and
+    scores them with configurable weights. Work is bounded by the candidate lists, not by N.
+    """
+
+    def __init__(self, content, collaborative=None, prior=None, weights=None, budget_ms=DEFAULT_BUDGET_MS):
+        self.content = content
+        self.collaborative = collaborative
+        self.prior = prior
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.budget_ms = budget_ms
+        self._popular = None if prior is None else np.argsort(-prior, kind='stable')[:POPULAR_POOL_SIZE]
+
+    @staticmethod
+    def _candidates(index, rows, weights):
+        ids, scores = index.neighbor_lists(rows)
+        ids = ids.ravel()
+        scores = (weights[:, None] * scores).ravel()
+        valid = ids >= 0
+        return ids[valid], scores[valid]
+
+    def rank(self, rows, weights, k, exclude=None, budget_ms=None):
+        """
+        Returns (rows, scores) of the k best candidates for the seed rows, best first.
+        Seeds and excluded rows are never returned. Once budget_ms is spent, the
+        remaining optional sources are skipped.
+        """
+        start = time.perf_counter()
+        budget = (self.budget_ms if budget_ms is None else budget_ms) / 1000.0
+        rows = np.asarray(rows, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float32)
+
+        sources = [('content', *self._candidates(self.content, rows, weights))]
+        if self.collaborative is not None and self.weights['collaborative']:
+            if time.perf_counter() - start < budget:
+                sources.append(('collaborative', *self._candidates(self.collaborative, rows, weights)))
+            else:
+                logger.debug("Latency budget spent, skipping collaborative candidates")
+
+        candidate_count = sum(len(ids) for _, ids, _ in sources)
+        if self.prior is not None and candidate_count < k + len(rows) and time.perf_counter() - start < budget:
+            # Cold start: too few neighbors, so fall back on popular movies
+            sources.append(('popular', self._popular, np.zeros(len(self._popular), dtype=np.float32)))
+
+        # Merge and dedupe: one slot per distinct candidate, one score column per source
+        ids = np.concatenate([source_ids for _, source_ids, _ in sources])
+        candidates, inverse = np.unique(ids, return_inverse=True)
+        scores = np.zeros(len(candidates), dtype=np.float32)
+        offset = 0
+        for name, source_ids, source_scores in sources:
+            weight = self.weights.get(name, 0.0)
+            if weight:
+                scores += weight * np.bincount(inverse[offset:offset + len(source_ids)],
+                                               weights=source_scores, minlength=len(candidates))
+            offset += len(source_ids)
+        if self.prior is not None:
+            scores += self.weights['popularity'] * self.prior[candidates]
+
+        blocked = np.isin(candidates, rows)
+        if exclude is not None and len(exclude):
+            blocked |= np.isin(candidates, exclude)
+        candidates, scores = candidates[~blocked], scores[~blocked]
+
+        top = top_k(scores, k)
+        return candidates[top], scores[top]
@@ -0,0 +1,199 @@
+"""
+In-process latency histograms, counters and slow-query samples for the hot paths.
+
+Set METRICS_ENABLED=0 to turn it off: @timed then returns the function unchanged, timer()
+hands back a shared no-op context manager and increment() returns straight away.
+"""
+
+import os
+import time
+import threading
+import functools
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_SAMPLES = 50
+
+# Log-linear buckets: values below 2·SUB_BUCKETS µs are exact, above that every power
+# of two is split into SUB_BUCKETS linear buckets, so any value is within ~6%.
+SUB_BUCKETS = 16
+BUCKETS = 64 * SUB_BUCKETS
+
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """It counts durations in microsecond buckets, HDR-histogram style: constant memory, O(1) record."""
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _index(value):
+        if value < 2 * SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - SUB_BUCKETS.bit_length()
+        return SUB_BUCKETS * shift + (value >> shift)
+
+    @staticmethod
+    def _value(index):
+        """Midpoint of a bucket, in microseconds."""
+        if index < 2 * SUB_BUCKETS:
+            return index
+        shift = index // SUB_BUCKETS - 1
+        return ((index % SUB_BUCKETS + SUB_BUCKETS) << shift) + (1 << shift) / 2
+
+    def record(self, seconds):
+        value = max(int(seconds * 1e6), 0)
+        index = min(self._index(value), BUCKETS - 1)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def percentile(self, q):
+        """q-th percentile (0-100) in milliseconds."""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(self._value(index), self.max) / 1000.0
+        return self.max / 1000.0
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count / 1000.0 if self.count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max / 1000.0,
+        }
+
+
+_histograms = {}
+_counters = {}
+_counters_lock = threading.Lock()
+slow_queries = deque(maxlen=SLOW_QUERY_SAMPLES)
+
+
+def histogram(name):
+    hist = _histograms.get(name)
+    if hist is None:
+        hist = _histograms.setdefault(name, Histogram())
+    return hist
+
+
+def record(name, seconds):
+    if ENABLED:
+        histogram(name).record(seconds)
+
+
+def increment(name, amount=1):
+    if not ENABLED:
+        return
+    with _counters_lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+class _Timer:
+    __slots__ = ('hist', 'start')
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.record(time.perf_counter() - self.start)
+        return False
+
+
+def timer(name):
+    """Context manager recording the duration of its block under name."""
+    return _Timer(histogram(name)) if ENABLED else _NOOP
+
+
+def timed(name):
+    """Decorator recording every call's duration under name."""
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+        hist = histogram(name)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.record(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def instrument_engine(engine, name="db.query"):
+    """Times every statement on a SQLAlchemy engine and keeps the latest slow ones."""
+    if not ENABLED:
+        return
+    from sqlalchemy import event
+
+    hist = histogram(name)
+
+    # The start time lives on the statement's execution context, so a statement that
+    # raises leaves nothing behind for the next one to pick up
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_metrics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        hist.record(elapsed)
+        if elapsed * 1000.0 >= SLOW_QUERY_MS:
+            slow_queries.append({
+                'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'duration_ms': round(elapsed * 1000.0, 1),
+                'statement': ' '.join(statement.split())[:500],
+            })
+
+
+def snapshot():
+    """Returns ({operation: summary}, {counter: value}, [slow queries, newest first])."""
+    with _counters_lock:
+        counters = dict(_counters)
+    return ({name: hist.summary() for name, hist in sorted(_histograms.items()) if hist.count},
+            counters, list(reversed(slow_queries)))
+
+
+def hit_ratio(counters, prefix):
+    """Share of <prefix>.hit among <prefix>.hit + <prefix>.miss, or None before any lookup."""
+    hits, misses = counters.get(f"{prefix}.hit", 0), counters.get(f"{prefix}.miss", 0)
+    return hits / (hits + misses) if hits + misses else None
+
+
+def reset():
+    for hist in list(_histograms.values()):
+        with hist._lock:
+            hist.counts = [0] * BUCKETS
+            hist.count = hist.total = hist.max = 0
+    with _counters_lock:
+        _counters.clear()
+    slow_queries.clear()
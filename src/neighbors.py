@@ -0,0 +1,107 @@
+"""Precomputed top-K neighbor index for the content recommender"""
+
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_K = 50
+
+
+def top_k(scores, k):
+    """
+    Returns the positions of the k highest scores, best first.
+    Ties are broken by position so the output is deterministic.
+    """
+    n = scores.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        # argpartition picks any of the rows tied with the k-th score; keep the first ones
+        kth = scores[candidates].min()
+        above = candidates[scores[candidates] > kth]
+        candidates = np.concatenate([above, np.flatnonzero(scores == kth)[:k - len(above)]])
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
+
+def top_k_rows(block, k):
+    """
+    Row-wise version of top_k for a 2-D block of scores.
+    Returns (ids, scores) arrays of shape (rows, k), best first, ties broken by position.
+    """
+    k = min(k, block.shape[1])
+    if k < block.shape[1]:
+        candidates = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        candidates.sort(axis=1)
+    else:
+        candidates = np.broadcast_to(np.arange(block.shape[1]), block.shape).copy()
+    candidate_scores = np.take_along_axis(block, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind='stable')
+    return (np.take_along_axis(candidates, order, axis=1),
+            np.take_along_axis(candidate_scores, order, axis=1))
+
+
+class NeighborIndex:
+    """
+    It keeps, for every movie row, the ids and scores of its K most similar movies
+    as compact int32/float32 arrays, so a lookup is a slice instead of a full sort.
+    """
+
+    def __init__(self, ids, scores, similarity=None):
+        self.ids = ids
+        self.scores = scores
+        # Optional dense matrix used only when more than K neighbors are requested
+        self.similarity = similarity
+
+    @property
+    def k(self):
+        return self.ids.shape[1]
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    @classmethod
+    def from_similarity(cls, similarity, k=DEFAULT_K, block_size=1024):
+        """Builds the index from a dense N×N similarity matrix, a block of rows at a time."""
+        n = similarity.shape[0]
+        k = min(k, n - 1)
+        ids = np.empty((n, k), dtype=np.int32)
+        scores = np.empty((n, k), dtype=np.float32)
+        for start in range(0, n, block_size):
+            stop = min(start + block_size, n)
+            block = np.array(similarity[start:stop], dtype=np.float32)
+            # A movie is never its own neighbor
+            block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+            ids[start:stop], scores[start:stop] = top_k_rows(block, k)
+        return cls(ids, scores, similarity=similarity)
+
+    @classmethod
+    def from_artifacts(cls, artifacts):
+        """Opens the index stored in an artifact directory (see src.artifacts)."""
+        return cls(artifacts['neighbor_ids'], artifacts['neighbor_scores'],
+                   similarity=artifacts.get('similarity'))
+
+    def neighbor_lists(self, rows):
+        """(len(rows), K) neighbor ids and scores of several rows at once."""
+        return self.ids[rows], self.scores[rows]
+
+    def neighbors(self, row, k):
+        """
+        Returns (ids, scores) of the k nearest neighbors of a movie row.
+        Falls back to an argpartition over the similarity row when k exceeds the precomputed K.
+        """
+        if k <= self.k:
+            return self.ids[row, :k], self.scores[row, :k]
+        if self.similarity is None:
+            logger.warning(f"Requested {k} neighbors but only {self.k} are precomputed")
+            return self.ids[row], self.scores[row]
+
+        row_scores = np.array(self.similarity[row], dtype=np.float32)
+        row_scores[row] = -np.inf
+        top = top_k(row_scores, k)
+        return top.astype(np.int32), row_scores[top]
@@ -1,30 +1,171 @@
-import pickle
-import pandas as pd
-from src.tmdb_utils import fetch_poster, fetch_movie_details
+import os
+import logging
+import numpy as np
+from sqlalchemy import select, literal, union_all
+from src.tmdb_utils import fetch_many, ERROR_POSTER
+from src.artifacts import ARTIFACT_DIR, load_artifacts
+from src.neighbors import NeighborIndex
+from src.ann import IVFIndex
+from src.embeddings import EmbeddingIndex
+from src.catalog import MovieCatalog
+from src.search import TitleSearchIndex
+from src.Database.database import get_db_session
+from src.Database.models import Rating, WatchlistItem
+from src.collaborative import CF_DIR, load_model
+from src.hybrid import HybridRanker, popularity_prior
+from src.filtered import FilteredRanker, full_scorer
+from src import metrics, result_cache
 
-# Loading data at startup
-movies = pickle.load(open('data/movie_list.pkl', 'rb'))
-similarity = pickle.load(open('data/similarity.pkl', 'rb'))
+logger = logging.getLogger(__name__)
 
-def recommend(movie_title):
-    """
-    Finds and returns 5 similar movies with their details.
-    """
-    try:
-        index = movies[movies['title'] == movie_title].index[0]
-    except IndexError:
-        return [] 
+# Loading data at startup: arrays are memory-mapped, nothing is unpickled
+artifacts = load_artifacts(ARTIFACT_DIR)
+movies = artifacts.movies
+catalog = MovieCatalog(movies)
+search_index = TitleSearchIndex(catalog.titles)
+similarity = artifacts.get('similarity')
+# 'exact' serves precomputed neighbor lists, 'ann' answers from the IVF index (see src.ann),
+# 'embedding' scores the low-rank embeddings on demand (see src.embeddings)
+BACKEND = os.getenv("RECOMMENDER_BACKEND", "exact" if 'neighbor_ids' in artifacts else "ann")
+if BACKEND == "ann":
+    neighbor_index = IVFIndex.from_artifacts(artifacts)
+elif BACKEND == "embedding":
+    neighbor_index = EmbeddingIndex.from_artifacts(artifacts)
+else:
+    neighbor_index = NeighborIndex.from_artifacts(artifacts)
+cf_model = load_model(CF_DIR, catalog)
+ranker = HybridRanker(
+    neighbor_index,
+    collaborative=cf_model,
+    prior=popularity_prior(catalog, None if cf_model is None else cf_model.rating_counts),
+)
+# Genre/year/seen filters score the whole catalog instead of the neighbor lists (see src.filtered)
+filtered_ranker = FilteredRanker(full_scorer(artifacts, neighbor_index), collaborative=cf_model,
+                                 prior=ranker.prior, weights=ranker.weights)
+
+# Seed weight of a watchlisted movie; ratings are mapped from 1..10 to -1..1
+WATCHLIST_WEIGHT = 0.5
 
-    distances = sorted(list(enumerate(similarity[index])), reverse=True, key=lambda x: x[1])
+def _with_metadata(rows):
+    """Turns catalog rows into recommendation dicts, fetching TMDB data in one batch."""
+    metadata_by_id = fetch_many(catalog.movie_ids[rows])
 
     recommended_movies = []
-    for i in distances[1:6]:  
-        movie_id = movies.iloc[i[0]].movie_id
-        movie_title = movies.iloc[i[0]].title
-        
+    for i in rows:
+        movie_id = catalog.movie_id(i)
+        metadata = metadata_by_id[movie_id]
+
         recommended_movies.append({
-            'title': movie_title,
-            'poster': fetch_poster(movie_id),
-            'details': fetch_movie_details(movie_id)
+            'movie_id': movie_id,
+            'title': catalog.title(i),
+            'poster': metadata['poster'],
+            'details': metadata['details']
         })
-    return recommended_movies
\ No newline at end of file
+    return recommended_movies
+
+def _cacheable(recommended_movies):
+    """Results carrying a failed TMDB fetch are not cached, so the next call retries it."""
+    return all(movie['poster'] != ERROR_POSTER for movie in recommended_movies)
+
+@metrics.timed("recommend")
+def recommend(movie_title, k=5):
+    """
+    Finds and returns k similar movies with their ids and details.
+    Results are cached per (title, k, artifact version); treat them as read-only.
+    """
+    key = (movie_title, k, artifacts.version)
+    cached = result_cache.recommendations.get(key)
+    if cached is not None:
+        return cached
+
+    row = catalog.row_for_title(movie_title)
+    if row is None:
+        return []
+
+    # Similar movies stay content-exact for every k; the hybrid ranker is for personalized lists
+    neighbor_ids, _ = neighbor_index.neighbors(row, k)
+    recommended_movies = _with_metadata(neighbor_ids)
+    if _cacheable(recommended_movies):
+        result_cache.recommendations.put(key, recommended_movies)
+    return recommended_movies
+
+@metrics.timed("load_user_seeds")
+def load_user_seeds(user_id):
+    """
+    Loads a user's rated and watchlisted movies with one query and returns
+    (rows, weights) aligned with the catalog.
+    """
+    ratings = select(Rating.movie_id, Rating.rating).where(Rating.user_id == user_id)
+    watchlist = select(WatchlistItem.movie_id, literal(None)).where(WatchlistItem.user_id == user_id)
+    with get_db_session() as session:
+        seeds = session.execute(union_all(ratings, watchlist)).all()
+
+    weights = {}
+    for movie_id, rating in seeds:
+        row = catalog.row_for_movie_id(movie_id)
+        if row is None:
+            continue
+        weight = WATCHLIST_WEIGHT if rating is None else (rating - 5.5) / 4.5
+        weights[row] = weights.get(row, 0.0) + weight
+    rows = np.fromiter(weights.keys(), dtype=np.int64, count=len(weights))
+    return rows, np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+
+@metrics.timed("recommend_filtered")
+def recommend_filtered(movie_title, k=5, user_id=None, genres=None, min_year=None, max_year=None):
+    """
+    Finds k movies similar to a title among those having all the given genres and released
+    within [min_year, max_year]; with a user_id, movies the user rated or watchlisted are left out.
+    Ranked by content like recommend(), so without genre or year filters the result is the
+    content ranking minus the seen movies. Returns fewer than k only when fewer movies pass the filters.
+    """
+    key = ('filtered', movie_title, k, artifacts.version, tuple(sorted(genres or ())), min_year, max_year)
+    cached = (result_cache.recommendations.get(key) if user_id is None
+              else result_cache.get_for_user(user_id, key))
+    if cached is not None:
+        return cached
+
+    row = catalog.row_for_title(movie_title)
+    if row is None:
+        return []
+
+    mask = catalog.filter_mask(genres, min_year, max_year)
+    if user_id is not None:
+        generation = result_cache.user_generation(user_id)
+        seen, _ = load_user_seeds(user_id)
+        mask[seen] = False
+    top, _ = filtered_ranker.similar(row, k, mask)
+    recommended_movies = _with_metadata(top)
+    if _cacheable(recommended_movies):
+        if user_id is None:
+            result_cache.recommendations.put(key, recommended_movies)
+        else:
+            result_cache.put_for_user(user_id, key, recommended_movies, generation)
+    return recommended_movies
+
+@metrics.timed("recommend_for_user")
+def recommend_for_user(user_id, k=5, genres=None, min_year=None, max_year=None):
+    """
+    Finds k movies for a user from everything they rated or watchlisted.
+    Liked movies pull their neighbors up, disliked ones push them down.
+    Genre and year filters go through the filtered ranker (see recommend_filtered).
+    Results are cached until the user rates or watchlists something (see src.result_cache).
+    """
+    filtered = bool(genres) or min_year is not None or max_year is not None
+    key = (k, artifacts.version, tuple(sorted(genres or ())), min_year, max_year) if filtered else (k, artifacts.version)
+    cached = result_cache.get_for_user(user_id, key)
+    if cached is not None:
+        return cached
+
+    generation = result_cache.user_generation(user_id)
+    rows, weights = load_user_seeds(user_id)
+    if rows.size == 0:
+        recommended_movies = []
+    else:
+        if filtered:
+            top, scores = filtered_ranker.rank(rows, weights, k, catalog.filter_mask(genres, min_year, max_year))
+        else:
+            top, scores = ranker.rank(rows, weights, k)
+        recommended_movies = _with_metadata(top[scores > 0])
+    if _cacheable(recommended_movies):
+        result_cache.put_for_user(user_id, key, recommended_movies, generation)
+    return recommended_movies
@@ -0,0 +1,148 @@
+"""
+In-process caches for recommendation results.
+
+`recommendations` holds recommend() results keyed by (title, k, artifact_version), so a
+Streamlit rerun that asks the same question again is a dict lookup. `user_recommendations`
+holds personalized lists per user; UserManager drops a user's entry whenever that user
+rates or watchlists a movie. Both are bounded LRUs with a TTL, so TMDB metadata baked into
+the results is refreshed eventually.
+
+The caches live in one process: a write only invalidates the cache of the process it ran in,
+and other processes catch up when the TTL expires.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from src import metrics
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "4096"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "600"))
+# Results kept per user; the oldest is dropped first
+USER_CACHE_KEYS = int(os.getenv("USER_CACHE_KEYS", "16"))
+
+
+class TTLCache:
+    """
+    It is a thread-safe LRU whose entries also expire ttl seconds after they were stored.
+    Hits and misses are counted here and as <name>.hit / <name>.miss metrics counters.
+    """
+
+    def __init__(self, name, maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, count=True):
+        """Returns the cached value or None. With count=False the lookup is left out of the stats."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._data[key]
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+        if count:
+            self.count(entry is not None)
+        return None if entry is None else entry[0]
+
+    def count(self, hit):
+        """Records one lookup in the stats and the metrics counters."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.increment(f"{self.name}.hit" if hit else f"{self.name}.miss")
+
+    def peek(self, key):
+        """Like get(), but neither counted nor refreshed in the LRU order."""
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+    def __len__(self):
+        return len(self._data)
+
+
+recommendations = TTLCache("recommend_cache")
+# Keyed by user id; the value maps a result key to (result, stored_at), so one pop invalidates them all.
+# Each result expires on its own stored_at; the entry's TTL only bounds the whole dict.
+user_recommendations = TTLCache("user_cache", maxsize=USER_CACHE_SIZE)
+
+
+def get_for_user(user_id, key):
+    # Counted per result, not per user entry: a user can be cached without this key
+    entries = user_recommendations.get(user_id, count=False)
+    entry = None if entries is None else entries.get(key)
+    if entry is not None and time.monotonic() - entry[1] > user_recommendations.ttl:
+        entry = None
+    user_recommendations.count(entry is not None)
+    return None if entry is None else entry[0]
+
+
+# Bumped by every invalidate_user; a result computed under an older generation is not stored
+_generations = {}
+_generations_lock = threading.Lock()
+
+
+def user_generation(user_id):
+    """The user's cache generation; read it before computing a result for put_for_user."""
+    return _generations.get(user_id, 0)
+
+
+def put_for_user(user_id, key, value, generation):
+    """
+    Stores a result unless the user was invalidated since `generation` was read, since a
+    write that landed while the result was computed would otherwise be cached over.
+    """
+    with _generations_lock:
+        if _generations.get(user_id, 0) != generation:
+            return
+        now = time.monotonic()
+        ttl = user_recommendations.ttl
+        entries = {k: entry for k, entry in (user_recommendations.peek(user_id) or {}).items()
+                   if k != key and now - entry[1] <= ttl}
+        entries[key] = (value, now)
+        # Insertion order is storage order, so the first keys are the oldest
+        for k in list(entries)[:max(len(entries) - USER_CACHE_KEYS, 0)]:
+            del entries[k]
+        user_recommendations.put(user_id, entries)
+
+
+def invalidate_user(user_id):
+    """Forgets a user's personalized results; call it after any write to their ratings or watchlist."""
+    with _generations_lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        user_recommendations.pop(user_id)
+
+
+def stats():
+    return {'recommend': recommendations.stats(), 'user': user_recommendations.stats()}
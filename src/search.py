@@ -0,0 +1,85 @@
+"""Ranked, typo-tolerant title search over the movie catalog"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+import numpy as np
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_title(text):
+    """Lowercases, strips accents and punctuation, and collapses whitespace."""
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii')
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+
+def _trigrams(text, prefix=False):
+    """
+    Character trigrams of every word, padded at word boundaries.
+    With prefix=True the last word is left open, so partially typed words still match.
+    """
+    words = text.split()
+    grams = set()
+    for i, word in enumerate(words):
+        padded = "  " + word + ("" if prefix and i == len(words) - 1 else " ")
+        grams.update(padded[j:j + 3] for j in range(len(padded) - 2))
+    return grams
+
+
+class TitleSearchIndex:
+    """
+    It indexes titles once at load time: a sorted list of normalized titles for prefix
+    matches and character-trigram postings for fuzzy matches. A query only touches the
+    postings of its own trigrams, never the whole catalog.
+    """
+
+    def __init__(self, titles, min_similarity=0.5):
+        self.min_similarity = min_similarity
+        normalized = [normalize_title(title) for title in titles]
+
+        self._exact = defaultdict(list)
+        postings = defaultdict(list)
+        self._gram_counts = np.zeros(len(normalized), dtype=np.int32)
+        for row, title in enumerate(normalized):
+            self._exact[title].append(row)
+            grams = _trigrams(title)
+            self._gram_counts[row] = len(grams)
+            for gram in grams:
+                postings[gram].append(row)
+        self._postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+        order = sorted(range(len(normalized)), key=normalized.__getitem__)
+        self._sorted_titles = [normalized[row] for row in order]
+        self._sorted_rows = np.array(order, dtype=np.int32)
+
+    def _prefix_rows(self, query):
+        start = bisect_left(self._sorted_titles, query)
+        stop = bisect_left(self._sorted_titles, query + '\x7f')
+        return self._sorted_rows[start:stop]
+
+    def search(self, query, limit=20, offset=0):
+        """
+        Returns (rows, total): one page of catalog rows ranked best first, and the number of matches.
+        Exact titles rank first, then titles starting with the query, then by trigram similarity.
+        """
+        query = normalize_title(query)
+        if not query:
+            return [], 0
+
+        grams = _trigrams(query, prefix=True)
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not lists:
+            return [], 0
+        rows, shared = np.unique(np.concatenate(lists), return_counts=True)
+
+        keep = shared >= self.min_similarity * len(grams)
+        rows, shared = rows[keep], shared[keep]
+        # Dice coefficient, so shorter titles with the same overlap rank higher
+        scores = 2.0 * shared / (len(grams) + self._gram_counts[rows])
+        scores += np.isin(rows, self._prefix_rows(query))
+        scores += 2.0 * np.isin(rows, self._exact.get(query, []))
+
+        ranked = rows[np.lexsort((rows, -scores))]
+        return ranked[offset:offset + limit].tolist(), len(ranked)
@@ -0,0 +1,69 @@
+"""Blocked, multi-process top-K cosine similarity over sparse tag vectors"""
+
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sklearn.preprocessing import normalize
+from src.neighbors import DEFAULT_K, top_k_rows
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 512
+
+# Set once per worker process by _init_worker
+_vectors = None
+_transposed = None
+
+
+def normalize_rows(vectors):
+    """Returns a float32 CSR copy of vectors with unit L2 rows, so dot products are cosines."""
+    return normalize(vectors.astype(np.float32), norm='l2').tocsr()
+
+
+def _init_worker(vectors):
+    global _vectors, _transposed
+    _vectors = vectors
+    _transposed = vectors.T.tocsc()
+
+
+def _block_neighbors(block):
+    """Computes the top-K neighbors of rows [start, stop) against every row."""
+    start, stop, k = block
+    scores = (_vectors[start:stop] @ _transposed).toarray()
+    # A movie is never its own neighbor
+    scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+    ids, top_scores = top_k_rows(scores, k)
+    return start, ids.astype(np.int32), top_scores.astype(np.float32)
+
+
+def _collect(results, ids, scores):
+    for start, block_ids, block_scores in results:
+        ids[start:start + len(block_ids)] = block_ids
+        scores[start:start + len(block_ids)] = block_scores
+
+
+def build_neighbors(vectors, k=DEFAULT_K, block_size=DEFAULT_BLOCK_SIZE, workers=None):
+    """
+    Returns (ids, scores) arrays of shape (N, k) with the top-K cosine neighbors of every row.
+    The matrix is normalized once and multiplied a block of rows at a time, so peak memory
+    per worker is block_size × N floats rather than N × N. Blocks are spread over a process pool;
+    workers=1 runs everything in the calling process.
+    """
+    vectors = normalize_rows(vectors)
+    n = vectors.shape[0]
+    k = min(k, n - 1)
+    workers = workers or os.cpu_count() or 1
+    blocks = [(start, min(start + block_size, n), k) for start in range(0, n, block_size)]
+
+    ids = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+
+    if workers == 1 or len(blocks) == 1:
+        _init_worker(vectors)
+        _collect(map(_block_neighbors, blocks), ids, scores)
+    else:
+        logger.info(f"Computing neighbors for {n} rows in {len(blocks)} blocks on {workers} workers")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(vectors,)) as executor:
+            _collect(executor.map(_block_neighbors, blocks), ids, scores)
+    return ids, scores
@@ -1,26 +1,120 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 import streamlit as st
+from src import metrics
 
-def fetch_poster(movie_id):
-    """Fetches the movie poster URL from TMDB."""
-    try:
-        url = BASE_URL.format(movie_id) + f"?api_key={API_KEY}&language=en-US"
-        data = requests.get(url).json()
-        poster_path = data.get('poster_path')
-        if poster_path:
-            return "https://image.tmdb.org/t/p/w500/" + poster_path
-        else:
-            return "https://via.placeholder.com/500x750?text=No+Image"
-    except Exception as e:
-        print(e)
-        return "https://via.placeholder.com/500x750?text=Error"
+logger = logging.getLogger(__name__)
 
-def fetch_movie_details(movie_id):
-    """Fetches additional movie details like overview, rating, and trailer."""
-    try:
-        url = BASE_URL.format(movie_id) + f"?api_key={API_KEY}&language=en-US&append_to_response=videos"
-        data = requests.get(url).json()
+API_KEY = os.getenv("TMDB_API_KEY", "YOUR_API_KEY")
+BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3/movie/{}")
+CACHE_PATH = os.getenv("TMDB_CACHE_PATH", "tmdb_cache.db")
+CACHE_TTL = int(os.getenv("TMDB_CACHE_TTL", 7 * 24 * 3600))
+
+POSTER_URL = "https://image.tmdb.org/t/p/w500/"
+NO_POSTER = "https://via.placeholder.com/500x750?text=No+Image"
+ERROR_POSTER = "https://via.placeholder.com/500x750?text=Error"
+ERROR_DETAILS = {'overview': 'Error fetching details.', 'vote_average': 0, 'release_date': 'N/A', 'trailer_key': None}
+
+
+class LRUCache:
+    """A small thread-safe in-process LRU cache."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
 
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskCache:
+    """Persistent key/value store in SQLite with a time-to-live per entry."""
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tmdb_cache ("
+                "movie_id INTEGER PRIMARY KEY, payload TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared across threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def get(self, movie_id):
+        row = self._connection().execute(
+            "SELECT payload, fetched_at FROM tmdb_cache WHERE movie_id = ?", (movie_id,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, movie_id, value):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tmdb_cache (movie_id, payload, fetched_at) VALUES (?, ?, ?)",
+                (movie_id, json.dumps(value), time.time())
+            )
+
+
+class TMDBClient:
+    """
+    It fetches movie metadata from TMDB with one pooled HTTP session and a two-tier cache:
+    an in-process LRU in front of a persistent SQLite store with a TTL.
+    """
+
+    def __init__(self, api_key=API_KEY, base_url=BASE_URL, cache_path=CACHE_PATH,
+                 cache_ttl=CACHE_TTL, memory_cache_size=2048, timeout=5, pool_size=20, max_concurrency=10):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="tmdb")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.memory_cache = LRUCache(memory_cache_size)
+        self.disk_cache = DiskCache(cache_path, cache_ttl) if cache_path else None
+
+    @staticmethod
+    def _parse(data):
+        """Turns a /movie/{id}?append_to_response=videos response into poster + details."""
+        poster_path = data.get('poster_path')
         details = {
             'overview': data.get('overview', 'No overview available.'),
             'vote_average': data.get('vote_average', 0),
@@ -29,12 +123,107 @@ def fetch_movie_details(movie_id):
         }
 
         # Finding the official trailer from the videos response
-        if 'videos' in data and data['videos']['results']:
-            for video in data['videos']['results']:
-                if video['type'] == 'Trailer' and video['site'] == 'YouTube':
-                    details['trailer_key'] = video['key']
-                    break
-        return details
-    except Exception as e:
-        print(e)
-        return {'overview': 'Error fetching details.', 'vote_average': 0, 'release_date': 'N/A', 'trailer_key': None}
+        videos = data.get('videos') or {}
+        for video in videos.get('results') or []:
+            if video.get('type') == 'Trailer' and video.get('site') == 'YouTube':
+                details['trailer_key'] = video['key']
+                break
+
+        return {
+            'poster': POSTER_URL + poster_path if poster_path else NO_POSTER,
+            'details': details,
+        }
+
+    @metrics.timed("tmdb.request")
+    def _request(self, movie_id):
+        url = self.base_url.format(movie_id)
+        params = {'api_key': self.api_key, 'language': 'en-US', 'append_to_response': 'videos'}
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return self._parse(response.json())
+
+    def _cached(self, movie_id):
+        movie = self.memory_cache.get(movie_id)
+        metrics.increment("tmdb.memory_cache.miss" if movie is None else "tmdb.memory_cache.hit")
+        if movie is not None or self.disk_cache is None:
+            return movie
+
+        try:
+            with metrics.timer("tmdb.disk_cache"):
+                movie = self.disk_cache.get(movie_id)
+        except sqlite3.Error as e:
+            logger.warning(f"TMDB disk cache read failed for {movie_id}: {e}")
+        metrics.increment("tmdb.disk_cache.miss" if movie is None else "tmdb.disk_cache.hit")
+        if movie is not None:
+            self.memory_cache.put(movie_id, movie)
+        return movie
+
+    def _fetch(self, movie_id):
+        try:
+            movie = self._request(movie_id)
+        except Exception as e:
+            logger.error(f"Error fetching TMDB data for movie {movie_id}: {e}")
+            metrics.increment("tmdb.errors")
+            return {'poster': ERROR_POSTER, 'details': dict(ERROR_DETAILS)}
+
+        self.memory_cache.put(movie_id, movie)
+        if self.disk_cache is not None:
+            try:
+                self.disk_cache.put(movie_id, movie)
+            except sqlite3.Error as e:
+                logger.warning(f"TMDB disk cache write failed for {movie_id}: {e}")
+        return movie
+
+    def get_movie(self, movie_id):
+        """
+        Returns {'poster': url, 'details': {...}} for a movie, hitting the network only on a cache miss.
+        Errors are not cached, so a failed fetch is retried on the next call.
+        """
+        movie_id = int(movie_id)
+        movie = self._cached(movie_id)
+        if movie is None:
+            movie = self._fetch(movie_id)
+        return movie
+
+    @metrics.timed("tmdb.fetch_many")
+    def fetch_many(self, movie_ids):
+        """
+        Returns {movie_id: {'poster': ..., 'details': ...}} for all ids. Cache misses are fetched
+        concurrently on at most max_concurrency threads, so a grid costs about one round trip.
+        A failed fetch gets the error placeholder without failing the others.
+        """
+        results = {}
+        misses = []
+        for movie_id in dict.fromkeys(int(movie_id) for movie_id in movie_ids):
+            movie = self._cached(movie_id)
+            if movie is None:
+                misses.append(movie_id)
+            else:
+                results[movie_id] = movie
+
+        if len(misses) == 1:
+            results[misses[0]] = self._fetch(misses[0])
+        elif misses:
+            results.update(zip(misses, self._executor.map(self._fetch, misses)))
+        return results
+
+
+@st.cache_resource
+def get_client():
+    """One shared client per process, so the session pool and LRU survive Streamlit reruns."""
+    return TMDBClient()
+
+
+def fetch_poster(movie_id):
+    """Fetches the movie poster URL from TMDB."""
+    return get_client().get_movie(movie_id)['poster']
+
+
+def fetch_movie_details(movie_id):
+    """Fetches additional movie details like overview, rating, and trailer."""
+    return get_client().get_movie(movie_id)['details']
+
+
+def fetch_many(movie_ids):
+    """Fetches posters and details for several movies concurrently, keyed by movie_id."""
+    return get_client().fetch_many(movie_ids)